@@ -8,15 +8,28 @@ import os
 import sys
 import subprocess
 import platform
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import version, PackageNotFoundError
 from pathlib import Path
 
+# Resolved once; platform.platform() can query the OS on first use
+_PLATFORM = platform.platform()
+
+# Every pip run prefers cached or published wheels over source builds and never prompts
+PIP_ENV = {
+    **os.environ,
+    "PIP_PREFER_BINARY": "1",
+    "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+    "PIP_NO_INPUT": "1",
+}
+
 def print_banner():
     """Print the application banner."""
     print("=" * 60)
     print("🛒 Price Tracker & Notifier - Windows Setup")
     print("=" * 60)
     print(f"Python Version: {sys.version}")
-    print(f"Platform: {platform.platform()}")
+    print(f"Platform: {_PLATFORM}")
     print("=" * 60)
 
 def check_python_version():
@@ -46,100 +59,71 @@ def install_build_tools():
     try:
         # Try to install wheel and setuptools first
         subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "wheel", "setuptools"], 
-                      check=True, capture_output=True, text=True)
+                      check=True, capture_output=True, text=True, env=PIP_ENV)
         print("✅ Build tools updated")
         return True
     except subprocess.CalledProcessError as e:
         print(f"⚠️  Warning: Could not update build tools: {e}")
         return False
 
+# Pinned versions with Windows wheels, in install order
+WINDOWS_PACKAGES = [
+    "requests==2.31.0",
+    "beautifulsoup4==4.12.2",
+    "lxml==4.9.3",
+    "python-dotenv==1.0.0",
+    "schedule==1.2.0",
+    "pandas==2.1.4",
+    "flask==3.0.0",
+    "flask-cors==4.0.0",
+    "plotly==5.17.0",
+    "playwright==1.40.0",
+    "selenium==4.15.2"
+]
+
+def is_installed(package):
+    """Check whether a pinned "name==version" requirement is already installed."""
+    name, _, pinned = package.partition("==")
+    try:
+        return version(name) == pinned
+    except PackageNotFoundError:
+        return False
+
 def install_dependencies_windows():
     """Install dependencies with Windows-specific handling."""
     print("📦 Installing dependencies (Windows-optimized)...")
     
-    # First, install packages that don't require compilation
-    basic_packages = [
-        "requests==2.31.0",
-        "beautifulsoup4==4.12.2",
-        "lxml==4.9.3",
-        "python-dotenv==1.0.0",
-        "schedule==1.2.0",
-        "pandas==2.1.4"
-    ]
-    
-    print("📦 Installing basic packages...")
-    for package in basic_packages:
-        try:
-            print(f"   Installing {package}...")
-            result = subprocess.run([sys.executable, "-m", "pip", "install", package], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                print(f"   ✅ {package} installed successfully")
-            else:
-                print(f"   ⚠️  Warning: {package} installation had issues")
-                print(f"      Error: {result.stderr}")
-        except Exception as e:
-            print(f"   ❌ Error installing {package}: {e}")
-    
-    # Install packages that might need special handling
-    print("📦 Installing advanced packages...")
+    # Re-runs skip pip entirely when every pinned version is already present
+    packages = [package for package in WINDOWS_PACKAGES if not is_installed(package)]
+    if not packages:
+        print("✅ All packages already installed")
+        return
     
-    # Try to install matplotlib with pre-compiled wheel
+    # One pip run resolves and installs everything in a single pass
     try:
-        print("   Installing matplotlib...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "matplotlib==3.8.2"], 
-                      check=True, capture_output=True, text=True)
-        print("   ✅ matplotlib installed successfully")
+        subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade-strategy", "only-if-needed", *packages], 
+                      check=True, capture_output=True, text=True, env=PIP_ENV)
+        print("✅ All packages installed successfully")
+        return
     except subprocess.CalledProcessError:
-        print("   ⚠️  matplotlib installation failed, trying alternative...")
-        try:
-            subprocess.run([sys.executable, "-m", "pip", "install", "matplotlib"], 
-                          check=True, capture_output=True, text=True)
-            print("   ✅ matplotlib installed with latest version")
-        except subprocess.CalledProcessError as e:
-            print(f"   ❌ matplotlib installation failed: {e}")
-    
-    # Install Flask and related packages
-    flask_packages = [
-        "flask==3.0.0",
-        "flask-cors==4.0.0"
-    ]
+        print("⚠️  Combined installation had issues, installing packages one at a time...")
     
-    for package in flask_packages:
+    for package in packages:
         try:
             print(f"   Installing {package}...")
             subprocess.run([sys.executable, "-m", "pip", "install", package], 
-                          check=True, capture_output=True, text=True)
+                          check=True, capture_output=True, text=True, env=PIP_ENV)
             print(f"   ✅ {package} installed successfully")
-        except subprocess.CalledProcessError as e:
-            print(f"   ❌ Error installing {package}: {e}")
-    
-    # Install Plotly
-    try:
-        print("   Installing plotly...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "plotly==5.17.0"], 
-                      check=True, capture_output=True, text=True)
-        print("   ✅ plotly installed successfully")
-    except subprocess.CalledProcessError as e:
-        print(f"   ❌ Error installing plotly: {e}")
-    
-    # Install Playwright (this might take a while)
-    try:
-        print("   Installing playwright...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "playwright==1.40.0"], 
-                      check=True, capture_output=True, text=True)
-        print("   ✅ playwright installed successfully")
-    except subprocess.CalledProcessError as e:
-        print(f"   ❌ Error installing playwright: {e}")
-    
-    # Install Selenium as backup
-    try:
-        print("   Installing selenium...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "selenium==4.15.2"], 
-                      check=True, capture_output=True, text=True)
-        print("   ✅ selenium installed successfully")
-    except subprocess.CalledProcessError as e:
-        print(f"   ❌ Error installing selenium: {e}")
+        except subprocess.CalledProcessError:
+            # No wheel for the pinned version on this Python; try the latest release
+            name = package.split("==")[0]
+            print(f"   ⚠️  {package} installation failed, trying latest {name}...")
+            try:
+                subprocess.run([sys.executable, "-m", "pip", "install", name], 
+                              check=True, capture_output=True, text=True, env=PIP_ENV)
+                print(f"   ✅ {name} installed with latest version")
+            except subprocess.CalledProcessError as e:
+                print(f"   ❌ Error installing {name}: {e}")
 
 def install_playwright_browsers():
     """Install Playwright browsers."""
@@ -154,11 +138,8 @@ def install_playwright_browsers():
         print("   You can install them manually later with: playwright install")
         return False
 
-def create_env_file():
-    """Create .env file with default configuration."""
-    print("⚙️  Creating .env file...")
-    
-    env_content = """# Price Tracker Configuration
+# Default configuration written to .env
+_ENV_TEMPLATE = """# Price Tracker Configuration
 # Database
 DATABASE_PATH=price_tracker.db
 
@@ -184,10 +165,13 @@ DASHBOARD_DEBUG=True
 LOG_LEVEL=INFO
 LOG_FILE=price_tracker.log
 """
+
+def create_env_file():
+    """Create .env file with default configuration."""
+    print("⚙️  Creating .env file...")
     
     try:
-        with open('.env', 'w') as f:
-            f.write(env_content)
+        Path('.env').write_text(_ENV_TEMPLATE, encoding='utf-8')
         print("✅ .env file created successfully")
         print("   📝 Please edit .env file with your email configuration")
         return True
@@ -205,14 +189,21 @@ def run_basic_tests():
         ("Testing config", "from config import Config; print('Config OK')"),
     ]
     
-    for test_name, test_code in tests:
-        try:
-            print(f"   Testing {test_name}...")
-            subprocess.run([sys.executable, "-c", test_code], 
-                          check=True, capture_output=True, text=True)
-            print(f"   ✅ {test_name} passed")
-        except subprocess.CalledProcessError as e:
-            print(f"   ❌ {test_name} failed: {e}")
+    # The checks are independent, so their interpreters start side by side
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        runs = [
+            executor.submit(subprocess.run, [sys.executable, "-c", test_code], 
+                            check=True, capture_output=True, text=True)
+            for _, test_code in tests
+        ]
+        
+        for (test_name, _), run in zip(tests, runs):
+            try:
+                print(f"   Testing {test_name}...")
+                run.result()
+                print(f"   ✅ {test_name} passed")
+            except subprocess.CalledProcessError as e:
+                print(f"   ❌ {test_name} failed: {e}")
 
 def show_next_steps():
     """Show next steps for the user."""
@@ -253,10 +244,14 @@ def main():
         print("❌ pip is required for installation")
         return
     
-    install_build_tools()
-    install_dependencies_windows()
-    install_playwright_browsers()
-    create_env_file()
+    # Writing .env needs no packages, so it runs alongside the installs
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        env_file = executor.submit(create_env_file)
+        install_build_tools()
+        install_dependencies_windows()
+        install_playwright_browsers()
+        env_file.result()
+    
     run_basic_tests()
     show_next_steps()
 
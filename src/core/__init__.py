@@ -3,18 +3,38 @@ Core modules for the Price Tracker application.
 Contains database, scraper, notifier, and main tracker logic.
 """
 
-from .config import Config
-from .database import DatabaseManager
-from .scraper import WebScraper, ScrapingManager
-from .notifier import EmailNotifier, NotificationManager
-from .price_tracker import PriceTracker
+import importlib
+
+# Submodules are imported on first attribute access (PEP 562), so importing one
+# core module does not drag in Playwright, SMTP and the rest
+_LAZY = {
+    'Config': '.config',
+    'DatabaseManager': '.database',
+    'WebScraper': '.scraper',
+    'ScrapingManager': '.scraper',
+    'EmailNotifier': '.notifier',
+    'NotificationManager': '.notifier',
+    'PriceTracker': '.price_tracker'
+}
 
 __all__ = [
     'Config',
-    'DatabaseManager', 
+    'DatabaseManager',
     'WebScraper',
     'ScrapingManager',
     'EmailNotifier',
     'NotificationManager',
     'PriceTracker'
 ]
+
+def __getattr__(name):
+    """Import the submodule that defines name on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    """List the lazy names alongside the loaded ones."""
+    return sorted(set(globals()) | set(__all__))
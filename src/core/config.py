@@ -2,78 +2,141 @@
 Configuration settings for the E-commerce Price Tracker & Notifier application.
 """
 import os
+import re
+import functools
+import logging
+from urllib.parse import urlparse
+from types import MappingProxyType
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+_env = os.environ
+
+# Load environment variables once per process tree; child processes inherit them
+if not (_env.get('PRICETRACKER_SKIP_DOTENV') or _env.get('PRICETRACKER_DOTENV_LOADED')):
+    load_dotenv()
+    _env['PRICETRACKER_DOTENV_LOADED'] = '1'
 
 class Config:
     """Main configuration class for the application."""
     
     # Database Configuration
-    DATABASE_PATH = os.getenv('DATABASE_PATH', 'price_tracker.db')
+    DATABASE_PATH = _env.get('DATABASE_PATH', 'price_tracker.db')
     
     # Email Configuration
-    SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
-    SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
-    SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
-    SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
-    EMAIL_RECIPIENT = os.getenv('EMAIL_RECIPIENT', '')
+    SMTP_HOST = _env.get('SMTP_HOST', 'smtp.gmail.com')
+    SMTP_PORT = int(_env.get('SMTP_PORT', '587'))
+    SMTP_USERNAME = _env.get('SMTP_USERNAME', '')
+    SMTP_PASSWORD = _env.get('SMTP_PASSWORD', '')
+    EMAIL_RECIPIENT = _env.get('EMAIL_RECIPIENT', '')
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(_env.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+    EMAIL_HTML_ENABLED = _env.get('EMAIL_HTML_ENABLED', 'True').lower() == 'true'
     
     # Scraping Configuration
-    REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
-    USER_AGENT = os.getenv('USER_AGENT', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+    REQUEST_TIMEOUT = int(_env.get('REQUEST_TIMEOUT', '30'))
+    USER_AGENT = _env.get('USER_AGENT', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+    
+    HTTP_POOL_SIZE = int(_env.get('HTTP_POOL_SIZE', '16'))
+    MAX_CONCURRENT_CHECKS = int(_env.get('MAX_CONCURRENT_CHECKS', '16'))
+    MAX_REQUESTS_PER_HOST = int(_env.get('MAX_REQUESTS_PER_HOST', '2'))
+    HOST_REQUEST_DELAY = float(_env.get('HOST_REQUEST_DELAY', '2'))  # seconds
+    MAX_PAGE_BYTES = int(_env.get('MAX_PAGE_BYTES', str(2 * 1024 * 1024)))
+    SCRAPE_CACHE_TTL = int(_env.get('SCRAPE_CACHE_TTL', '300'))  # seconds, 0 disables
+    SCRAPE_CACHE_SIZE = int(_env.get('SCRAPE_CACHE_SIZE', '1000'))
     
-    # Headers for web scraping
-    HEADERS = {
+    # Headers for web scraping (read-only, shared by every session)
+    HEADERS = MappingProxyType({
         'User-Agent': USER_AGENT,
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
         'Accept-Encoding': 'gzip, deflate',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
-    }
+    })
     
     # Price tracking settings
-    DEFAULT_CHECK_INTERVAL = int(os.getenv('DEFAULT_CHECK_INTERVAL', '3600'))  # 1 hour in seconds
-    PRICE_DROP_THRESHOLD_PERCENT = float(os.getenv('PRICE_DROP_THRESHOLD_PERCENT', '5.0'))  # 5% drop
+    DEFAULT_CHECK_INTERVAL = int(_env.get('DEFAULT_CHECK_INTERVAL', '3600'))  # 1 hour in seconds
+    PRICE_DROP_THRESHOLD_PERCENT = float(_env.get('PRICE_DROP_THRESHOLD_PERCENT', '5.0'))  # 5% drop
     
     # Dashboard Configuration
-    DASHBOARD_HOST = os.getenv('DASHBOARD_HOST', 'localhost')
-    DASHBOARD_PORT = int(os.getenv('DASHBOARD_PORT', '5000'))
-    DASHBOARD_DEBUG = os.getenv('DASHBOARD_DEBUG', 'False').lower() == 'true'
+    DASHBOARD_HOST = _env.get('DASHBOARD_HOST', 'localhost')
+    DASHBOARD_PORT = int(_env.get('DASHBOARD_PORT', '5000'))
+    DASHBOARD_DEBUG = _env.get('DASHBOARD_DEBUG', 'False').lower() == 'true'
+    DASHBOARD_CACHE_TTL = int(_env.get('DASHBOARD_CACHE_TTL', '30'))  # seconds
+    DASHBOARD_THREADS = int(_env.get('DASHBOARD_THREADS', '16'))
+    JINJA_CACHE_DIR = _env.get('JINJA_CACHE_DIR', '')  # empty: a per-user directory under the system temp dir
     
     # Logging Configuration
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.getenv('LOG_FILE', 'price_tracker.log')
+    LOG_LEVEL = _env.get('LOG_LEVEL', 'INFO')
+    LOG_LEVEL_INT = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
+    LOG_FILE = _env.get('LOG_FILE', 'price_tracker.log')
+    LOG_FORMAT = _env.get('LOG_FORMAT', 'text').lower()  # 'text' or 'json'
     
-    # Supported E-commerce sites
-    SUPPORTED_SITES = {
-        'amazon': {
+    # Supported E-commerce sites (frozen; selector lists are tuples)
+    SUPPORTED_SITES = MappingProxyType({
+        'amazon': MappingProxyType({
             'domain': 'amazon',
-            'price_selectors': [
+            'domain_aliases': ('amzn',),
+            'price_selectors': (
                 'span.a-price-whole',
                 'span.a-offscreen',
                 'span.a-price span.a-offscreen',
                 '.a-price .a-offscreen'
-            ],
-            'title_selectors': [
+            ),
+            'title_selectors': (
                 'span#productTitle',
                 'h1#title',
                 '#productTitle'
-            ]
-        },
-        'flipkart': {
+            )
+        }),
+        'flipkart': MappingProxyType({
             'domain': 'flipkart',
-            'price_selectors': [
+            'price_selectors': (
                 'div._30jeq3._16Jk6d',
                 'div._1_WHN1',
                 'span._16Jk6d'
-            ],
-            'title_selectors': [
+            ),
+            'title_selectors': (
                 'span.B_NuCI',
                 'h1._10Ermw',
                 'h1[class*="title"]'
-            ]
-        }
-    }
+            )
+        })
+    })
+    
+    # Domain keyword (or alias) -> site key, matched anywhere in the host in one regex pass
+    SITE_BY_DOMAIN = MappingProxyType({
+        domain: name
+        for name, site in SUPPORTED_SITES.items()
+        for domain in (site['domain'],) + site.get('domain_aliases', ())
+    })
+    SITE_REGEX = re.compile('|'.join(map(re.escape, SITE_BY_DOMAIN)))
+    
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def detect_site(cls, url: str):
+        """Return the SUPPORTED_SITES key for a URL, or None if the site is unsupported."""
+        match = cls.SITE_REGEX.search(urlparse(url).netloc.lower())
+        return cls.SITE_BY_DOMAIN[match.group()] if match else None
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def session(cls):
+        """Return the shared HTTP session with pooled keep-alive connections."""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.request import ACCEPT_ENCODING
+        
+        session = requests.Session()
+        session.headers.update(cls.HEADERS)
+        # Advertise every encoding urllib3 can decode here (adds br/zstd when installed)
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        # Each host sees at most MAX_REQUESTS_PER_HOST concurrent scrapes; never make them queue for a socket.
+        # No transport retries: ScrapingManager already retries with backoff
+        adapter = HTTPAdapter(
+            pool_connections=cls.HTTP_POOL_SIZE,
+            pool_maxsize=max(cls.HTTP_POOL_SIZE, cls.MAX_REQUESTS_PER_HOST),
+            max_retries=0
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
@@ -4,26 +4,55 @@ Handles all database operations including schema creation, data insertion, and q
 """
 import sqlite3
 import logging
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from config import Config
 
 # Configure logging
-logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
+logging.basicConfig(level=Config.LOG_LEVEL_INT)
 logger = logging.getLogger(__name__)
 
+# Per-connection tuning; journal_mode=WAL is persistent and set once in init_database
+_CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
 class DatabaseManager:
     """Manages all database operations for the price tracker application."""
     
     def __init__(self, db_path: str = None):
         """Initialize database connection and create tables if they don't exist."""
         self.db_path = db_path or Config.DATABASE_PATH
+        self._local = threading.local()
+        self._connect_args = {}
+        if self.db_path == ':memory:':
+            # Each thread has its own connection, so a plain :memory: would give each one an empty
+            # database. A named in-memory one is shared by all of them and the anchor keeps it alive;
+            # the memdb VFS (SQLite 3.36+) locks like a file and honours the busy timeout, which
+            # shared-cache mode does not, so prefer it where available
+            if sqlite3.sqlite_version_info >= (3, 36):
+                self.db_path = f'file:/price_tracker_{id(self)}?vfs=memdb'
+            else:
+                self.db_path = f'file:price_tracker_{id(self)}?mode=memory&cache=shared'
+            self._connect_args = {'uri': True}
+            self._memory_anchor = sqlite3.connect(self.db_path, uri=True)
         self.init_database()
     
     def get_connection(self):
-        """Get a database connection with proper configuration."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """Get this thread's database connection, opening and configuring it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Implicit transactions start as BEGIN IMMEDIATE: writers queue on the busy timeout
+            # up front instead of failing when a read lock can't be upgraded mid-transaction
+            conn = sqlite3.connect(self.db_path, isolation_level='IMMEDIATE', **self._connect_args)
+            conn.row_factory = sqlite3.Row  # Enable column access by name
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
         return conn
     
     def init_database(self):
@@ -32,6 +61,9 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
+                # WAL lets dashboard reads proceed while price checks write
+                cursor.execute('PRAGMA journal_mode=WAL')
+                
                 # Create products table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS products (
@@ -44,10 +76,18 @@ class DatabaseManager:
                         is_active BOOLEAN DEFAULT 1,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        check_interval INTEGER DEFAULT 3600
+                        check_interval INTEGER DEFAULT 3600,
+                        etag TEXT,
+                        last_modified TEXT
                     )
                 ''')
                 
+                # HTTP validators from the last scrape, added to databases created before they existed
+                columns = {row['name'] for row in cursor.execute('PRAGMA table_info(products)')}
+                for column in ('etag', 'last_modified'):
+                    if column not in columns:
+                        cursor.execute(f'ALTER TABLE products ADD COLUMN {column} TEXT')
+                
                 # Create price_history table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS price_history (
@@ -75,16 +115,25 @@ class DatabaseManager:
                 
                 # Create indexes for better performance
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_url ON products(url)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_active ON products(is_active)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history(product_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_timestamp ON price_history(timestamp)')
+                # Active products in check order; only usable when the query spells out is_active = 1
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_due ON products(last_checked) WHERE is_active = 1')
+                # Covers the history queries: ordered range scan on (product_id, timestamp) without touching the table
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_ph_pid_ts_price ON price_history(product_id, timestamp, price)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_product ON notifications(product_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_notif_pending ON notifications(sent_at) WHERE email_sent = 0')
+                
+                # Superseded by the composite indexes above
+                cursor.execute('DROP INDEX IF EXISTS idx_products_active')
+                cursor.execute('DROP INDEX IF EXISTS idx_price_history_product')
+                cursor.execute('DROP INDEX IF EXISTS idx_price_history_timestamp')
+                cursor.execute('DROP INDEX IF EXISTS idx_ph_pid_ts')
+                cursor.execute('DROP INDEX IF EXISTS idx_products_active_checked')
                 
                 conn.commit()
                 logger.info("Database initialized successfully")
                 
         except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
             raise
     
     def add_product(self, product_name: str, url: str, threshold_price: float, 
@@ -93,40 +142,75 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # Re-adding a known URL updates it in place, keeping its id and history
                 cursor.execute('''
-                    INSERT OR REPLACE INTO products 
+                    INSERT INTO products 
                     (product_name, url, threshold_price, site_type, check_interval)
                     VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        product_name = excluded.product_name,
+                        threshold_price = excluded.threshold_price,
+                        site_type = excluded.site_type,
+                        check_interval = excluded.check_interval,
+                        is_active = 1
                 ''', (product_name, url, threshold_price, site_type, 
                      check_interval or Config.DEFAULT_CHECK_INTERVAL))
                 
-                product_id = cursor.lastrowid
+                # Read the id back in the same transaction; RETURNING would need SQLite 3.35+
+                cursor.execute('SELECT id FROM products WHERE url = ?', (url,))
+                product_id = cursor.fetchone()[0]
                 conn.commit()
-                logger.info(f"Added product: {product_name} with ID: {product_id}")
+                logger.info("Added product: %s with ID: %s", product_name, product_id)
                 return product_id
                 
         except Exception as e:
-            logger.error(f"Error adding product: {e}")
+            logger.error("Error adding product: %s", e)
             raise
     
-    def get_all_products(self, active_only: bool = True) -> List[Dict]:
-        """Get all products from the database."""
+    def get_all_products(self, active_only: bool = True) -> List[sqlite3.Row]:
+        """Get all products from the database as rows (index and name access)."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 query = '''
                     SELECT * FROM products 
-                    WHERE is_active = ? 
+                    WHERE is_active = 1 
                     ORDER BY last_checked ASC
                 ''' if active_only else 'SELECT * FROM products ORDER BY last_checked ASC'
                 
-                cursor.execute(query, (1,) if active_only else ())
-                products = [dict(row) for row in cursor.fetchall()]
-                return products
+                cursor.execute(query)
+                return cursor.fetchall()
                 
         except Exception as e:
-            logger.error(f"Error getting products: {e}")
+            logger.error("Error getting products: %s", e)
+            return []
+    
+    def get_all_products_formatted(self, active_only: bool = True, active_label: str = 'Active',
+                                   inactive_label: str = 'Inactive', missing: str = 'N/A') -> List[Tuple]:
+        """Get products as display-ready tuples with prices formatted by SQLite."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                
+                cursor.execute('''
+                    SELECT id,
+                           product_name,
+                           CASE WHEN current_price THEN printf('₹%.2f', current_price) ELSE ? END,
+                           printf('%.2f', threshold_price),
+                           site_type,
+                           CASE WHEN is_active THEN ? ELSE ? END,
+                           last_checked
+                    FROM products
+                    WHERE is_active = 1 OR ?
+                    ORDER BY last_checked ASC
+                ''', (missing, active_label, inactive_label, not active_only))
+                
+                return cursor.fetchall()
+                
+        except Exception as e:
+            logger.error("Error getting formatted products: %s", e)
             return []
     
     def get_product_by_id(self, product_id: int) -> Optional[Dict]:
@@ -139,21 +223,23 @@ class DatabaseManager:
                 return dict(row) if row else None
                 
         except Exception as e:
-            logger.error(f"Error getting product {product_id}: {e}")
+            logger.error("Error getting product %s: %s", product_id, e)
             return None
     
-    def update_product_price(self, product_id: int, new_price: float):
+    def update_product_price(self, product_id: int, new_price: float,
+                             etag: str = None, last_modified: str = None):
         """Update the current price of a product and add to price history."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Update current price and last_checked
+                # Update current price, last_checked and the page's HTTP validators
                 cursor.execute('''
                     UPDATE products 
-                    SET current_price = ?, last_checked = CURRENT_TIMESTAMP
+                    SET current_price = ?, last_checked = CURRENT_TIMESTAMP,
+                        etag = ?, last_modified = ?
                     WHERE id = ?
-                ''', (new_price, product_id))
+                ''', (new_price, etag, last_modified, product_id))
                 
                 # Add to price history
                 cursor.execute('''
@@ -162,14 +248,48 @@ class DatabaseManager:
                 ''', (product_id, new_price))
                 
                 conn.commit()
-                logger.info(f"Updated price for product {product_id}: {new_price}")
+                logger.debug("Updated price for product %s: %s", product_id, new_price)
+                
+        except Exception as e:
+            logger.error("Error updating product price: %s", e)
+            raise
+    
+    def record_price_checks(self, updates: List[Tuple], notifications: List[Tuple] = ()):
+        """Save a check cycle's price updates, history rows and notifications in one transaction."""
+        if not updates and not notifications:
+            return
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE products 
+                    SET current_price = ?, last_checked = CURRENT_TIMESTAMP,
+                        etag = ?, last_modified = ?
+                    WHERE id = ?
+                ''', [(price, etag, last_modified, product_id) for product_id, price, etag, last_modified in updates])
+                cursor.executemany('''
+                    INSERT INTO price_history (product_id, price)
+                    VALUES (?, ?)
+                ''', [(product_id, price) for product_id, price, _, _ in updates])
+                cursor.executemany('''
+                    INSERT INTO notifications 
+                    (product_id, old_price, new_price, threshold_price)
+                    VALUES (?, ?, ?, ?)
+                ''', notifications)
+                
+                # One commit, and so one WAL sync, for the whole cycle
+                conn.commit()
+                logger.debug("Updated prices for %s products", len(updates))
+                if notifications:
+                    logger.info("Added %s notifications", len(notifications))
                 
         except Exception as e:
-            logger.error(f"Error updating product price: {e}")
+            logger.error("Error recording price checks: %s", e)
             raise
     
-    def get_price_history(self, product_id: int, days: int = 30) -> List[Dict]:
-        """Get price history for a product over the specified number of days."""
+    def get_price_history(self, product_id: int, days: int = 30) -> List[sqlite3.Row]:
+        """Get price history rows for a product over the specified number of days."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -177,17 +297,60 @@ class DatabaseManager:
                     SELECT price, timestamp 
                     FROM price_history 
                     WHERE product_id = ? 
-                    AND timestamp >= datetime('now', '-{} days')
+                    AND timestamp >= datetime('now', ?)
                     ORDER BY timestamp ASC
-                '''.format(days), (product_id,))
+                ''', (product_id, f'-{int(days)} days'))
                 
-                history = [dict(row) for row in cursor.fetchall()]
-                return history
+                return cursor.fetchall()
                 
         except Exception as e:
-            logger.error(f"Error getting price history: {e}")
+            logger.error("Error getting price history: %s", e)
             return []
     
+    def iter_price_history(self, product_id: int, days: int = 30) -> Iterator[sqlite3.Row]:
+        """Yield price history rows straight from the cursor, oldest first."""
+        yield from self.get_connection().execute('''
+            SELECT price, timestamp 
+            FROM price_history 
+            WHERE product_id = ? 
+            AND timestamp >= datetime('now', ?)
+            ORDER BY timestamp ASC
+        ''', (product_id, f'-{int(days)} days'))
+    
+    def get_price_history_columns(self, product_id: int, days: int = 30) -> Tuple[tuple, tuple]:
+        """Get price history as (timestamps, prices) columns, oldest first."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                cursor.execute('''
+                    SELECT timestamp, price 
+                    FROM price_history 
+                    WHERE product_id = ? 
+                    AND timestamp >= datetime('now', ?)
+                    ORDER BY timestamp ASC
+                ''', (product_id, f'-{int(days)} days'))
+                
+                # Transpose the plain tuples into two columns in one pass
+                columns = tuple(zip(*cursor.fetchall()))
+                return columns if columns else ((), ())
+                
+        except Exception as e:
+            logger.error("Error getting price history: %s", e)
+            return (), ()
+    
+    def get_latest_price_timestamp(self, product_id: int) -> Optional[str]:
+        """Get the timestamp of a product's newest price record."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT MAX(timestamp) FROM price_history WHERE product_id = ?', (product_id,))
+                return cursor.fetchone()[0]
+                
+        except Exception as e:
+            logger.error("Error getting latest price timestamp: %s", e)
+            return None
+    
     def add_notification(self, product_id: int, old_price: float, 
                         new_price: float, threshold_price: float) -> int:
         """Add a new price drop notification."""
@@ -202,27 +365,31 @@ class DatabaseManager:
                 
                 notification_id = cursor.lastrowid
                 conn.commit()
-                logger.info(f"Added notification for product {product_id}")
+                logger.info("Added notification for product %s", product_id)
                 return notification_id
                 
         except Exception as e:
-            logger.error(f"Error adding notification: {e}")
+            logger.error("Error adding notification: %s", e)
             raise
     
-    def mark_notification_sent(self, notification_id: int):
-        """Mark a notification as sent."""
+    def mark_notifications_sent(self, notification_ids: List[int]):
+        """Mark several notifications as sent in one statement."""
+        if not notification_ids:
+            return
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                placeholders = ','.join('?' * len(notification_ids))
+                cursor.execute(f'''
                     UPDATE notifications 
                     SET email_sent = 1 
-                    WHERE id = ?
-                ''', (notification_id,))
+                    WHERE id IN ({placeholders})
+                ''', tuple(notification_ids))
                 conn.commit()
                 
         except Exception as e:
-            logger.error(f"Error marking notification as sent: {e}")
+            logger.error("Error marking notifications as sent: %s", e)
             raise
     
     def get_pending_notifications(self) -> List[Dict]:
@@ -242,9 +409,51 @@ class DatabaseManager:
                 return notifications
                 
         except Exception as e:
-            logger.error(f"Error getting pending notifications: {e}")
+            logger.error("Error getting pending notifications: %s", e)
             return []
     
+    def iter_pending_notifications(self, batch_size: int = 256) -> Iterator[List[Dict]]:
+        """Yield unsent notifications oldest first, at most batch_size per list."""
+        # Each batch is a fresh keyset query, so callers can mark a batch sent before asking for the next
+        after = ('', 0)
+        while True:
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT n.*, p.product_name, p.url 
+                        FROM notifications n
+                        JOIN products p ON n.product_id = p.id
+                        WHERE n.email_sent = 0 AND (n.sent_at, n.id) > (?, ?)
+                        ORDER BY n.sent_at ASC, n.id ASC
+                        LIMIT ?
+                    ''', (*after, batch_size))
+                    
+                    batch = [dict(row) for row in cursor.fetchall()]
+                    
+            except Exception as e:
+                logger.error("Error getting pending notifications: %s", e)
+                return
+            
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1]['sent_at'], batch[-1]['id'])
+    
+    def get_pending_notification_count(self) -> int:
+        """Count notifications that haven't been sent yet."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*) FROM notifications WHERE email_sent = 0')
+                return cursor.fetchone()[0]
+                
+        except Exception as e:
+            logger.error("Error counting pending notifications: %s", e)
+            return 0
+    
     def deactivate_product(self, product_id: int):
         """Deactivate a product (stop tracking)."""
         try:
@@ -256,49 +465,84 @@ class DatabaseManager:
                     WHERE id = ?
                 ''', (product_id,))
                 conn.commit()
-                logger.info(f"Deactivated product {product_id}")
+                logger.info("Deactivated product %s", product_id)
                 
         except Exception as e:
-            logger.error(f"Error deactivating product: {e}")
+            logger.error("Error deactivating product: %s", e)
             raise
     
-    def get_statistics(self) -> Dict:
-        """Get application statistics."""
+    def deactivate_product_returning(self, product_id: int) -> Optional[str]:
+        """Deactivate a product and return its name, or None if it doesn't exist."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE products 
+                    SET is_active = 0 
+                    WHERE id = ?
+                ''', (product_id,))
+                
+                # Read the name inside the update's transaction; RETURNING would need SQLite 3.35+
+                row = None
+                if cursor.rowcount:
+                    cursor.execute('SELECT product_name FROM products WHERE id = ?', (product_id,))
+                    row = cursor.fetchone()
+                conn.commit()
                 
-                # Total products
-                cursor.execute('SELECT COUNT(*) FROM products WHERE is_active = 1')
-                total_products = cursor.fetchone()[0]
+                if row:
+                    logger.info("Deactivated product %s", product_id)
+                return row[0] if row else None
                 
-                # Products with price drops
+        except Exception as e:
+            logger.error("Error deactivating product: %s", e)
+            raise
+    
+    def get_change_summary(self) -> Tuple:
+        """Get a cheap fingerprint that changes whenever products, prices or notifications do."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT COUNT(DISTINCT product_id) 
-                    FROM notifications 
-                    WHERE email_sent = 1
+                    SELECT (SELECT COUNT(*) FROM products),
+                           (SELECT SUM(is_active) FROM products),
+                           (SELECT MAX(last_checked) FROM products),
+                           (SELECT MAX(id) FROM price_history),
+                           (SELECT MAX(id) FROM notifications),
+                           (SELECT SUM(email_sent) FROM notifications)
                 ''')
-                products_with_drops = cursor.fetchone()[0]
+                return tuple(cursor.fetchone())
                 
-                # Total notifications sent
-                cursor.execute('SELECT COUNT(*) FROM notifications WHERE email_sent = 1')
-                total_notifications = cursor.fetchone()[0]
+        except Exception as e:
+            logger.error("Error getting change summary: %s", e)
+            return ()
+    
+    def get_statistics(self) -> Dict:
+        """Get application statistics."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 
-                # Average price drop percentage
+                # All counters in a single statement
                 cursor.execute('''
-                    SELECT AVG(((old_price - new_price) / old_price) * 100)
+                    SELECT (SELECT COUNT(*) FROM products WHERE is_active = 1),
+                           COUNT(DISTINCT product_id),
+                           COUNT(*),
+                           AVG(((old_price - new_price) / old_price) * 100),
+                           (SELECT COUNT(*) FROM notifications WHERE email_sent = 0)
                     FROM notifications 
                     WHERE email_sent = 1
                 ''')
-                avg_drop_percent = cursor.fetchone()[0] or 0
+                total_products, products_with_drops, total_notifications, avg_drop_percent, pending = cursor.fetchone()
+                avg_drop_percent = avg_drop_percent or 0
                 
                 return {
                     'total_products': total_products,
                     'products_with_drops': products_with_drops,
                     'total_notifications': total_notifications,
-                    'avg_drop_percent': round(avg_drop_percent, 2)
+                    'avg_drop_percent': round(avg_drop_percent, 2),
+                    'pending_notifications': pending
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting statistics: {e}")
+            logger.error("Error getting statistics: %s", e)
             return {}
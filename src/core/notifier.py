@@ -2,18 +2,108 @@
 Email notification module for the E-commerce Price Tracker & Notifier application.
 Handles SMTP email sending for price drop alerts.
 """
+import os
+import queue
 import smtplib
 import logging
+from contextlib import contextmanager
+from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import List, Dict, Optional
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from config import Config
 
 # Configure logging
-logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
+logging.basicConfig(level=Config.LOG_LEVEL_INT)
 logger = logging.getLogger(__name__)
 
+# Email bodies are compiled once at import and only rendered per send
+EMAIL_TEMPLATES = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), '..', '..', 'templates', 'email')),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+    trim_blocks=True
+)
+PRICE_DROP_HTML = EMAIL_TEMPLATES.get_template('price_drop.html')
+PRICE_DROP_TEXT = EMAIL_TEMPLATES.get_template('price_drop.txt')
+SUMMARY_HTML = EMAIL_TEMPLATES.get_template('summary.html')
+SUMMARY_TEXT = EMAIL_TEMPLATES.get_template('summary.txt')
+
+def _price_drop_context(notification: Dict) -> Dict:
+    """Template fields for one notification, with the drop worked out once."""
+    old_price = notification['old_price']
+    new_price = notification['new_price']
+    price_drop = old_price - new_price
+    return {
+        'product_name': notification['product_name'],
+        'url': notification['url'],
+        'old_price': old_price,
+        'new_price': new_price,
+        'threshold_price': notification['threshold_price'],
+        'price_drop': price_drop,
+        'price_drop_percent': (price_drop / old_price) * 100
+    }
+
+class SMTPPool:
+    """Pool of idle logged-in SMTP connections, each replaced after a message cap."""
+    
+    def __init__(self, connect, max_messages_per_conn: int):
+        """Initialize an empty pool; connections are opened on demand."""
+        self.connect = connect
+        self.max_messages_per_conn = max_messages_per_conn
+        self._idle = queue.LifoQueue()
+    
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        """Check an open connection with NOOP."""
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+    
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        """Close a connection politely, falling back to dropping the socket."""
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+    
+    @contextmanager
+    def connection(self):
+        """Check out a live connection, reusing an idle one when possible."""
+        try:
+            server, sent = self._idle.get_nowait()
+            if not self._is_alive(server):
+                server.close()
+                server, sent = self.connect(), 0
+        except queue.Empty:
+            server, sent = self.connect(), 0
+        
+        try:
+            yield server
+        except Exception:
+            server.close()
+            raise
+        
+        # Rotate connections so providers' per-connection limits are never hit
+        sent += 1
+        if sent >= self.max_messages_per_conn:
+            self._quit(server)
+        else:
+            self._idle.put((server, sent))
+    
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
 class EmailNotifier:
     """Handles email notifications for price drops."""
     
@@ -25,6 +115,9 @@ class EmailNotifier:
         self.smtp_password = Config.SMTP_PASSWORD
         self.recipient = Config.EMAIL_RECIPIENT
         
+        # Connections kept open while inside session()
+        self._pool = None
+        
         # Validate configuration
         self._validate_config()
     
@@ -41,187 +134,78 @@ class EmailNotifier:
         logger.info("Email configuration validated successfully")
         return True
     
-    def _create_price_drop_email(self, notification_data: Dict) -> MIMEMultipart:
-        """Create a price drop notification email."""
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"🚨 Price Drop Alert: {notification_data['product_name']}"
-        msg['From'] = self.smtp_username
-        msg['To'] = self.recipient
-        
-        # Calculate price drop percentage
-        old_price = notification_data['old_price']
-        new_price = notification_data['new_price']
-        price_drop = old_price - new_price
-        price_drop_percent = (price_drop / old_price) * 100
-        
-        # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f4f4f4; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ text-align: center; margin-bottom: 30px; }}
-                .price-drop {{ background-color: #ff6b6b; color: white; padding: 20px; border-radius: 8px; text-align: center; margin: 20px 0; }}
-                .product-info {{ background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                .price-comparison {{ display: flex; justify-content: space-between; margin: 20px 0; }}
-                .old-price {{ text-decoration: line-through; color: #6c757d; }}
-                .new-price {{ color: #28a745; font-weight: bold; font-size: 1.2em; }}
-                .cta-button {{ display: inline-block; background-color: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #6c757d; font-size: 0.9em; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎉 Price Drop Alert!</h1>
-                    <p>Great news! The price of a product you're tracking has dropped.</p>
-                </div>
-                
-                <div class="price-drop">
-                    <h2>Price Dropped by {price_drop_percent:.1f}%</h2>
-                    <p>You saved ₹{price_drop:.2f}!</p>
-                </div>
-                
-                <div class="product-info">
-                    <h3>{notification_data['product_name']}</h3>
-                    <div class="price-comparison">
-                        <div>
-                            <span class="old-price">Old Price: ₹{old_price:.2f}</span>
-                        </div>
-                        <div>
-                            <span class="new-price">New Price: ₹{new_price:.2f}</span>
-                        </div>
-                    </div>
-                    <p><strong>Threshold Price:</strong> ₹{notification_data['threshold_price']:.2f}</p>
-                </div>
-                
-                <div style="text-align: center;">
-                    <a href="{notification_data['url']}" class="cta-button">View Product</a>
-                </div>
-                
-                <div class="footer">
-                    <p>This notification was sent by your Price Tracker application.</p>
-                    <p>Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text content
-        text_content = f"""
-        Price Drop Alert!
-        
-        Product: {notification_data['product_name']}
-        Old Price: ₹{old_price:.2f}
-        New Price: ₹{new_price:.2f}
-        Price Drop: ₹{price_drop:.2f} ({price_drop_percent:.1f}%)
-        Threshold Price: ₹{notification_data['threshold_price']:.2f}
-        
-        View Product: {notification_data['url']}
-        
-        This notification was sent by your Price Tracker application.
-        Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        """
+    def _connect(self) -> smtplib.SMTP:
+        """Open an SMTP connection with TLS and log in."""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        try:
+            server.starttls()
+            server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _deliver(self, msg: MIMEBase):
+        """Send a message over a pooled connection, or a one-off connection outside a session."""
+        if self._pool is None:
+            with self._connect() as server:
+                server.send_message(msg)
+            return
         
-        # Attach both HTML and text versions
-        msg.attach(MIMEText(text_content, 'plain'))
-        msg.attach(MIMEText(html_content, 'html'))
+        with self._pool.connection() as server:
+            server.send_message(msg)
+    
+    @contextmanager
+    def session(self):
+        """Reuse authenticated SMTP connections for every email sent inside the block."""
+        if self._pool is not None:
+            yield self._pool
+            return
         
-        return msg
+        # Connections open on first use, so configuration errors still surface per email
+        self._pool = SMTPPool(self._connect, Config.SMTP_MAX_MESSAGES_PER_CONNECTION)
+        try:
+            yield self._pool
+        finally:
+            pool, self._pool = self._pool, None
+            pool.close()
     
-    def _create_summary_email(self, notifications: List[Dict]) -> MIMEMultipart:
-        """Create a summary email for multiple price drops."""
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"📊 Price Tracker Summary - {len(notifications)} Price Drops"
+    def _build_email(self, subject: str, text_template, html_template, context: Dict) -> MIMEBase:
+        """Render an email as text plus HTML, or text only when EMAIL_HTML_ENABLED is off."""
+        if Config.EMAIL_HTML_ENABLED:
+            # Attach both HTML and text versions
+            msg = MIMEMultipart('alternative')
+            msg.attach(MIMEText(text_template.render(context), 'plain'))
+            msg.attach(MIMEText(html_template.render(context), 'html'))
+        else:
+            msg = MIMEText(text_template.render(context), 'plain')
+        
+        msg['Subject'] = subject
         msg['From'] = self.smtp_username
         msg['To'] = self.recipient
+        return msg
+    
+    def _create_price_drop_email(self, notification_data: Dict) -> MIMEBase:
+        """Create a price drop notification email."""
+        context = _price_drop_context(notification_data)
+        context['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        # Create HTML content
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f4f4f4; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ text-align: center; margin-bottom: 30px; }}
-                .summary {{ background-color: #e3f2fd; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                .product-item {{ border: 1px solid #ddd; margin: 10px 0; padding: 15px; border-radius: 5px; }}
-                .price-info {{ display: flex; justify-content: space-between; margin: 10px 0; }}
-                .old-price {{ text-decoration: line-through; color: #6c757d; }}
-                .new-price {{ color: #28a745; font-weight: bold; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #6c757d; font-size: 0.9em; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>📊 Price Tracker Summary</h1>
-                    <p>You have {len(notifications)} price drop(s) to review.</p>
-                </div>
-                
-                <div class="summary">
-                    <h3>Summary</h3>
-                    <p>Total Products with Price Drops: {len(notifications)}</p>
-                </div>
-        """
-        
-        # Add each product
-        for notification in notifications:
-            old_price = notification['old_price']
-            new_price = notification['new_price']
-            price_drop = old_price - new_price
-            price_drop_percent = (price_drop / old_price) * 100
-            
-            html_content += f"""
-                <div class="product-item">
-                    <h4>{notification['product_name']}</h4>
-                    <div class="price-info">
-                        <span class="old-price">₹{old_price:.2f}</span>
-                        <span>→</span>
-                        <span class="new-price">₹{new_price:.2f}</span>
-                        <span>({price_drop_percent:.1f}% drop)</span>
-                    </div>
-                    <p><a href="{notification['url']}">View Product</a></p>
-                </div>
-            """
-        
-        html_content += """
-                <div class="footer">
-                    <p>This summary was sent by your Price Tracker application.</p>
-                    <p>Timestamp: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S') + """</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text content
-        text_content = f"Price Tracker Summary\n\nYou have {len(notifications)} price drop(s) to review.\n\n"
-        
-        for notification in notifications:
-            old_price = notification['old_price']
-            new_price = notification['new_price']
-            price_drop = old_price - new_price
-            price_drop_percent = (price_drop / old_price) * 100
-            
-            text_content += f"""
-Product: {notification['product_name']}
-Old Price: ₹{old_price:.2f} → New Price: ₹{new_price:.2f} ({price_drop_percent:.1f}% drop)
-View Product: {notification['url']}
-
-"""
-        
-        text_content += f"\nThis summary was sent by your Price Tracker application.\nTimestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        # Attach both HTML and text versions
-        msg.attach(MIMEText(text_content, 'plain'))
-        msg.attach(MIMEText(html_content, 'html'))
+        return self._build_email(
+            f"🚨 Price Drop Alert: {notification_data['product_name']}",
+            PRICE_DROP_TEXT, PRICE_DROP_HTML, context
+        )
+    
+    def _create_summary_email(self, notifications: List[Dict]) -> MIMEBase:
+        """Create a summary email for multiple price drops."""
+        context = {
+            'items': [_price_drop_context(notification) for notification in notifications],
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
         
-        return msg
+        return self._build_email(
+            f"📊 Price Tracker Summary - {len(notifications)} Price Drops",
+            SUMMARY_TEXT, SUMMARY_HTML, context
+        )
     
     def send_price_drop_notification(self, notification_data: Dict) -> bool:
         """Send a single price drop notification email."""
@@ -233,10 +217,7 @@ View Product: {notification['url']}
             msg = self._create_price_drop_email(notification_data)
             
             # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self._deliver(msg)
             
             logger.info(f"Price drop notification sent for {notification_data['product_name']}")
             return True
@@ -265,10 +246,7 @@ View Product: {notification['url']}
             msg = self._create_summary_email(notifications)
             
             # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self._deliver(msg)
             
             logger.info(f"Summary notification sent for {len(notifications)} products")
             return True
@@ -301,7 +279,20 @@ View Product: {notification['url']}
             
             result['config_valid'] = True
             
-            # Test SMTP connection
+            # Test email (plain text only, no multipart wrapper)
+            test_content = """
+            This is a test email from your Price Tracker application.
+            
+            If you received this email, your email configuration is working correctly!
+            
+            Timestamp: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            test_msg = MIMEText(test_content, 'plain')
+            test_msg['Subject'] = "🧪 Price Tracker - Test Email"
+            test_msg['From'] = self.smtp_username
+            test_msg['To'] = self.recipient
+            
+            # Connection, login and send all happen over this one connection
             with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
                 server.starttls()
                 result['smtp_connection'] = True
@@ -310,25 +301,11 @@ View Product: {notification['url']}
                 server.login(self.smtp_username, self.smtp_password)
                 result['authentication'] = True
                 
-                # Send test email
-                test_msg = MIMEMultipart('alternative')
-                test_msg['Subject'] = "🧪 Price Tracker - Test Email"
-                test_msg['From'] = self.smtp_username
-                test_msg['To'] = self.recipient
-                
-                test_content = """
-                This is a test email from your Price Tracker application.
-                
-                If you received this email, your email configuration is working correctly!
-                
-                Timestamp: """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                test_msg.attach(MIMEText(test_content, 'plain'))
                 server.send_message(test_msg)
-                result['test_email_sent'] = True
-                
-                logger.info("Email configuration test successful")
-                
+            
+            result['test_email_sent'] = True
+            logger.info("Email configuration test successful")
+            
         except Exception as e:
             result['error'] = str(e)
             logger.error(f"Email configuration test failed: {e}")
@@ -341,7 +318,11 @@ class NotificationManager:
     def __init__(self):
         """Initialize the notification manager."""
         self.notifier = EmailNotifier()
-        self.batch_size = 5  # Send summary emails for batches larger than this
+        self.batch_size = 1  # Any batch of two or more drops goes out as one summary email
+    
+    def session(self):
+        """Reuse one logged-in SMTP connection for every email sent inside the block."""
+        return self.notifier.session()
     
     def process_notifications(self, notifications: List[Dict]) -> Dict:
         """Process a list of notifications and send appropriate emails."""
@@ -350,6 +331,7 @@ class NotificationManager:
             'individual_emails_sent': 0,
             'summary_emails_sent': 0,
             'failed_emails': 0,
+            'sent_ids': [],
             'errors': []
         }
         
@@ -363,17 +345,19 @@ class NotificationManager:
                 logger.info(f"Sending summary email for {len(notifications)} notifications")
                 if self.notifier.send_summary_notification(notifications):
                     results['summary_emails_sent'] = 1
+                    results['sent_ids'] = [n['id'] for n in notifications]
                 else:
                     results['failed_emails'] += 1
                     results['errors'].append("Failed to send summary email")
             else:
-                # Send individual emails
-                for notification in notifications:
-                    if self.notifier.send_price_drop_notification(notification):
-                        results['individual_emails_sent'] += 1
-                    else:
-                        results['failed_emails'] += 1
-                        results['errors'].append(f"Failed to send email for {notification.get('product_name', 'Unknown')}")
+                # A single drop gets its own detailed email
+                notification = notifications[0]
+                if self.notifier.send_price_drop_notification(notification):
+                    results['individual_emails_sent'] = 1
+                    results['sent_ids'] = [notification['id']]
+                else:
+                    results['failed_emails'] += 1
+                    results['errors'].append(f"Failed to send email for {notification.get('product_name', 'Unknown')}")
             
             logger.info(f"Notification processing completed: {results}")
             
@@ -2,19 +2,23 @@
 Main price tracker module for the E-commerce Price Tracker & Notifier application.
 Orchestrates scraping, database operations, and notifications.
 """
+import functools
+import itertools
+import json
 import logging
+import threading
 import time
-import schedule
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from urllib.parse import urlparse
 from .database import DatabaseManager
-from .scraper import ScrapingManager
-from .notifier import NotificationManager
 from .config import Config
 
 # Configure logging
 logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
+    level=Config.LOG_LEVEL_INT,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(Config.LOG_FILE),
@@ -23,18 +27,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, for LOG_FORMAT=json."""
+    
+    def format(self, record):
+        entry = {'t': record.created, 'lvl': record.levelname, 'name': record.name, 'msg': record.getMessage()}
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode('utf-8') if orjson else json.dumps(entry)
+
+if Config.LOG_FORMAT == 'json':
+    # The root handlers may have been installed by whichever module configured logging first
+    for _handler in logging.getLogger().handlers:
+        _handler.setFormatter(JsonFormatter())
+
+# check_all_products saves results in groups of this many, or at least this often, instead of once at the end
+CHECK_WRITE_BATCH_SIZE = 50
+CHECK_WRITE_INTERVAL = 10  # seconds
+
 class PriceTracker:
     """Main price tracker application that orchestrates all operations."""
     
     def __init__(self):
         """Initialize the price tracker with all components."""
         self.db = DatabaseManager()
-        self.scraper = ScrapingManager()
-        self.notifier = NotificationManager()
         self.is_running = False
+        self._stop_event = threading.Event()
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
         
         logger.info("Price Tracker initialized successfully")
     
+    @functools.cached_property
+    def scraper(self):
+        """Scraping manager, created on first use so DB-only commands skip the Playwright import."""
+        from .scraper import ScrapingManager
+        return ScrapingManager()
+    
+    @functools.cached_property
+    def notifier(self):
+        """Notification manager, created on first use so SMTP setup only happens when needed."""
+        from .notifier import NotificationManager
+        return NotificationManager()
+    
+    @contextmanager
+    def _host_slot(self, url: str):
+        """Limit concurrent scrapes per site; the scraper spaces the requests themselves."""
+        host = Config.detect_site(url) or urlparse(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(Config.MAX_REQUESTS_PER_HOST))
+        
+        with slot:
+            yield
+    
     def add_product(self, url: str, threshold_price: float, 
                    product_name: str = None, check_interval: int = None) -> Dict:
         """Add a new product to track."""
@@ -64,7 +114,7 @@ class PriceTracker:
             )
             
             # Update with current price
-            self.db.update_product_price(product_id, scraped_data['price'])
+            self.db.update_product_price(product_id, scraped_data['price'], scraped_data.get('etag'), scraped_data.get('last_modified'))
             
             logger.info(f"Successfully added product: {product_name} (ID: {product_id})")
             
@@ -94,50 +144,7 @@ class PriceTracker:
                     'error': f'Product with ID {product_id} not found'
                 }
             
-            logger.info(f"Checking price for product: {product['product_name']}")
-            
-            # Scrape current price
-            scraped_data = self.scraper.scrape_with_retry(product['url'])
-            
-            if not scraped_data:
-                return {
-                    'success': False,
-                    'error': 'Could not scrape current price'
-                }
-            
-            old_price = product['current_price']
-            new_price = scraped_data['price']
-            
-            # Update database with new price
-            self.db.update_product_price(product_id, new_price)
-            
-            # Check if price dropped below threshold
-            price_dropped = False
-            notification_created = False
-            
-            if new_price <= product['threshold_price'] and old_price and new_price < old_price:
-                price_dropped = True
-                
-                # Create notification
-                notification_id = self.db.add_notification(
-                    product_id=product_id,
-                    old_price=old_price,
-                    new_price=new_price,
-                    threshold_price=product['threshold_price']
-                )
-                notification_created = True
-                
-                logger.info(f"Price drop detected for {product['product_name']}: {old_price} → {new_price}")
-            
-            return {
-                'success': True,
-                'product_name': product['product_name'],
-                'old_price': old_price,
-                'new_price': new_price,
-                'threshold_price': product['threshold_price'],
-                'price_dropped': price_dropped,
-                'notification_created': notification_created
-            }
+            return self._check_product(product)
             
         except Exception as e:
             logger.error(f"Error checking product price: {e}")
@@ -146,9 +153,59 @@ class PriceTracker:
                 'error': str(e)
             }
     
-    def check_all_products(self) -> Dict:
+    def _check_product(self, product: Dict, pending_writes: List = None) -> Dict:
+        """Scrape a loaded product and record the result, or queue the writes on pending_writes."""
+        logger.debug("Checking price for product: %s", product['product_name'])
+        
+        # Scrape current price; a price check records a new observation, so it must not reuse a cached scrape.
+        # With a known price the request carries the stored validators, and a 304 keeps that price
+        validators = (product['etag'], product['last_modified']) if product['current_price'] else (None, None)
+        with self._host_slot(product['url']):
+            scraped_data = self.scraper.scrape_with_retry(product['url'], bypass_cache=True,
+                                                          etag=validators[0], last_modified=validators[1])
+        
+        if scraped_data and scraped_data.get('unchanged'):
+            logger.debug("Page unchanged for product: %s", product['product_name'])
+            scraped_data['price'] = product['current_price']
+        
+        if not scraped_data:
+            return {
+                'success': False,
+                'error': 'Could not scrape current price'
+            }
+        
+        old_price = product['current_price']
+        new_price = scraped_data['price']
+        price_update = (product['id'], new_price, scraped_data.get('etag'), scraped_data.get('last_modified'))
+        
+        # Check if price dropped below threshold
+        notification = None
+        if new_price <= product['threshold_price'] and old_price and new_price < old_price:
+            notification = (product['id'], old_price, new_price, product['threshold_price'])
+            logger.info("Price drop detected for %s: %s → %s", product['product_name'], old_price, new_price)
+        
+        # Update database with new price and any notification
+        if pending_writes is None:
+            self.db.update_product_price(*price_update)
+            if notification:
+                self.db.add_notification(*notification)
+        else:
+            pending_writes.append((price_update, notification))
+        
+        return {
+            'success': True,
+            'product_name': product['product_name'],
+            'old_price': old_price,
+            'new_price': new_price,
+            'threshold_price': product['threshold_price'],
+            'price_dropped': notification is not None,
+            'notification_created': notification is not None
+        }
+    
+    def check_all_products(self, max_workers: int = None) -> Dict:
         """Check prices for all active products."""
         try:
+            max_workers = max_workers or Config.MAX_CONCURRENT_CHECKS
             products = self.db.get_all_products(active_only=True)
             
             if not products:
@@ -160,7 +217,7 @@ class PriceTracker:
                     'errors': []
                 }
             
-            logger.info(f"Checking prices for {len(products)} products")
+            logger.info(f"Checking prices for {len(products)} products with {max_workers} workers")
             
             results = {
                 'success': True,
@@ -169,23 +226,64 @@ class PriceTracker:
                 'errors': []
             }
             
-            for product in products:
+            # Workers queue their writes here; each group is saved in one transaction
+            pending_writes = []
+            writes_lock = threading.Lock()
+            last_flush = [time.monotonic()]
+            
+            def flush(force=False):
+                with writes_lock:
+                    due = len(pending_writes) >= CHECK_WRITE_BATCH_SIZE or time.monotonic() - last_flush[0] >= CHECK_WRITE_INTERVAL
+                    if not pending_writes or not (force or due):
+                        return
+                    batch = pending_writes[:]
+                    pending_writes.clear()
+                    last_flush[0] = time.monotonic()
+                
                 try:
-                    check_result = self.check_product_price(product['id'])
-                    
-                    if check_result['success']:
-                        results['products_checked'] += 1
-                        if check_result.get('price_dropped'):
-                            results['price_drops'] += 1
-                    else:
-                        results['errors'].append(f"Product {product['product_name']}: {check_result['error']}")
-                        
+                    self.db.record_price_checks(
+                        [price_update for price_update, _ in batch],
+                        [notification for _, notification in batch if notification]
+                    )
                 except Exception as e:
-                    logger.error(f"Error checking product {product['product_name']}: {e}")
-                    results['errors'].append(f"Product {product['product_name']}: {str(e)}")
+                    # Keep the group for the next flush; the final one reports a persistent failure
+                    with writes_lock:
+                        pending_writes[:0] = batch
+                        pending = len(pending_writes)
+                    if force:
+                        raise
+                    logger.warning(f"Failed to save price checks, keeping {pending} pending: {e}")
+            
+            def check(product):
+                writes = []
+                try:
+                    result = self._check_product(product, writes)
+                except Exception as e:
+                    logger.error("Error checking product %s: %s", product['product_name'], e)
+                    return {'success': False, 'error': str(e)}
                 
-                # Small delay between requests to be respectful
-                time.sleep(2)
+                with writes_lock:
+                    pending_writes.extend(writes)
+                flush()
+                return result
+            
+            # Create the shared scraper before the workers race to do it
+            self.scraper
+            
+            try:
+                # Fetches are network-bound, so overlap them on a thread pool; _host_slot caps each site and the scraper paces its requests
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(products)))) as executor:
+                    for product, check_result in zip(products, executor.map(check, products)):
+                        if check_result['success']:
+                            results['products_checked'] += 1
+                            if check_result.get('price_dropped'):
+                                results['price_drops'] += 1
+                        else:
+                            # Kept as (id, name, error); callers format only what they display
+                            results['errors'].append((product['id'], product['product_name'], check_result['error']))
+            finally:
+                # Save whatever is left, even when the cycle is interrupted
+                flush(force=True)
             
             logger.info(f"Price check completed: {results['products_checked']} checked, {results['price_drops']} drops")
             return results
@@ -200,9 +298,27 @@ class PriceTracker:
     def process_notifications(self) -> Dict:
         """Process all pending notifications and send emails."""
         try:
-            pending_notifications = self.db.get_pending_notifications()
+            notifications_processed = 0
+            emails_sent = 0
+            failed_emails = 0
+            
+            # Send and mark one batch at a time so a long backlog is never loaded whole;
+            # the session keeps one logged-in SMTP connection for all of the batches
+            with self.notifier.session():
+                for batch in self.db.iter_pending_notifications():
+                    logger.info(f"Processing {len(batch)} pending notifications")
+                    
+                    notification_results = self.notifier.process_notifications(batch)
+                    # Failed sends stay pending so the next run retries them
+                    self.db.mark_notifications_sent(notification_results['sent_ids'])
+                    
+                    logger.info(f"Notification processing completed: {notification_results}")
+                    
+                    notifications_processed += len(batch)
+                    emails_sent += notification_results['individual_emails_sent'] + notification_results['summary_emails_sent']
+                    failed_emails += notification_results['failed_emails']
             
-            if not pending_notifications:
+            if not notifications_processed:
                 logger.info("No pending notifications to process")
                 return {
                     'success': True,
@@ -210,22 +326,11 @@ class PriceTracker:
                     'emails_sent': 0
                 }
             
-            logger.info(f"Processing {len(pending_notifications)} pending notifications")
-            
-            # Process notifications
-            notification_results = self.notifier.process_notifications(pending_notifications)
-            
-            # Mark notifications as sent
-            for notification in pending_notifications:
-                self.db.mark_notification_sent(notification['id'])
-            
-            logger.info(f"Notification processing completed: {notification_results}")
-            
             return {
                 'success': True,
-                'notifications_processed': len(pending_notifications),
-                'emails_sent': notification_results['individual_emails_sent'] + notification_results['summary_emails_sent'],
-                'failed_emails': notification_results['failed_emails']
+                'notifications_processed': notifications_processed,
+                'emails_sent': emails_sent,
+                'failed_emails': failed_emails
             }
             
         except Exception as e:
@@ -261,6 +366,8 @@ class PriceTracker:
     
     def start_scheduler(self):
         """Start the scheduled price checking."""
+        import schedule
+        
         try:
             logger.info("Starting price tracker scheduler")
             
@@ -271,13 +378,15 @@ class PriceTracker:
             self.run_price_check_cycle()
             
             self.is_running = True
+            self._stop_event.clear()
             
             logger.info("Scheduler started successfully")
             
-            # Keep the scheduler running
+            # Sleep until the next job is due (capped at 5 minutes); stop_scheduler wakes the wait immediately
             while self.is_running:
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                idle = schedule.idle_seconds()
+                self._stop_event.wait(300 if idle is None else min(max(idle, 0), 300))
                 
         except KeyboardInterrupt:
             logger.info("Scheduler stopped by user")
@@ -290,22 +399,25 @@ class PriceTracker:
         """Stop the scheduled price checking."""
         logger.info("Stopping price tracker scheduler")
         self.is_running = False
+        self._stop_event.set()
+        
+        import schedule
         schedule.clear()
-        self.scraper.cleanup()
+        
+        # Only clean up a scraper that was actually created
+        if 'scraper' in self.__dict__:
+            self.scraper.cleanup()
     
     def get_statistics(self) -> Dict:
         """Get application statistics."""
         try:
             db_stats = self.db.get_statistics()
             
-            # Get recent activity
-            recent_products = self.db.get_all_products(active_only=True)
-            recent_notifications = self.db.get_pending_notifications()
-            
+            # Get recent activity; db_stats already counts active products and pending notifications
             return {
                 'database_stats': db_stats,
-                'active_products': len(recent_products),
-                'pending_notifications': len(recent_notifications),
+                'active_products': db_stats.get('total_products', 0),
+                'pending_notifications': db_stats.get('pending_notifications', 0),
                 'last_check': datetime.now().isoformat()
             }
             
@@ -332,30 +444,24 @@ class PriceTracker:
     def export_price_history(self, product_id: int, format: str = 'csv') -> Dict:
         """Export price history for a product."""
         try:
-            history = self.db.get_price_history(product_id, days=30)
-            
             if format.lower() == 'csv':
-                import csv
-                import io
-                
-                output = io.StringIO()
-                writer = csv.writer(output)
-                writer.writerow(['Date', 'Price'])
-                
-                for entry in history:
-                    writer.writerow([entry['timestamp'], entry['price']])
+                # Rows are read from the cursor lazily, header first, for csv.writer.writerows;
+                # the first row is fetched here so a failing query is reported below
+                history = ((entry['timestamp'], entry['price']) for entry in self.db.iter_price_history(product_id, days=30))
+                first = next(history, None)
+                rows = itertools.chain([('Date', 'Price')], [first] if first else [], history)
                 
                 return {
                     'success': True,
                     'format': 'csv',
-                    'data': output.getvalue(),
+                    'data': rows,
                     'filename': f'price_history_{product_id}.csv'
                 }
             
             return {
                 'success': True,
                 'format': 'json',
-                'data': history
+                'data': [dict(entry) for entry in self.db.get_price_history(product_id, days=30)]
             }
             
         except Exception as e:
@@ -3,27 +3,77 @@ Web scraper module for the E-commerce Price Tracker & Notifier application.
 Supports Amazon and Flipkart with both BeautifulSoup and Playwright for dynamic content.
 """
 import re
+import json
+import random
 import logging
+import threading
+import time
 import requests
+import soupsieve
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
 from config import Config
 
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
+
 # Configure logging
-logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
+logging.basicConfig(level=Config.LOG_LEVEL_INT)
 logger = logging.getLogger(__name__)
 
+# First number in the text, with optional thousands separators and decimals ("1,23,456", "1,234.56")
+PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+# An amount after a currency marker, with an optional M.R.P label (the struck-out list price)
+CURRENCY_PRICE_RE = re.compile(r'(M\.?R\.?P[.:\s]*)?(?:₹|Rs\.?|INR|\$)\s*(\d[\d,]*(?:\.\d+)?)', re.I)
+
+# Statuses meaning the product page is gone; retrying or falling back to Playwright cannot help
+GONE_STATUSES = frozenset({404, 410})
+
+# Structured data blocks; most product pages carry a schema.org Product near the top
+JSON_LD_RE = re.compile(rb'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+
+# Resources Playwright never downloads while scraping
+BLOCKED_RESOURCES = '**/*.{png,jpg,jpeg,gif,svg,webp,ico,woff,woff2,ttf,css}'
+
+# CSS selectors compiled once at import instead of on every parsed page
+COMPILED_SELECTORS = {
+    site_type: {
+        'title_selectors': tuple(soupsieve.compile(s) for s in site_config['title_selectors']),
+        'price_selectors': tuple(soupsieve.compile(s) for s in site_config['price_selectors'])
+    }
+    for site_type, site_config in Config.SUPPORTED_SITES.items()
+}
+
 class WebScraper:
     """Web scraper for extracting product information from e-commerce sites."""
     
     def __init__(self):
         """Initialize the scraper with configuration."""
-        self.session = requests.Session()
-        self.session.headers.update(Config.HEADERS)
+        self.session = Config.session()
         self.playwright = None
         self.browser = None
+        self.context = None
+        self.page = None
+        # Playwright's sync API is bound to the thread that started it
+        self._playwright_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='playwright')
+        # url -> (expires_at, result) for recent successful scrapes, oldest first
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        # site -> monotonic time the next request to it may start
+        self._next_request_at = {}
+        self._pacing_lock = threading.Lock()
     
     def __enter__(self):
         """Context manager entry."""
@@ -35,76 +85,189 @@ class WebScraper:
     
     def cleanup(self):
         """Clean up Playwright resources."""
+        if self.playwright:
+            self._playwright_executor.submit(self._close_playwright).result()
+    
+    def _close_playwright(self):
+        """Close the browser and stop Playwright on its owning thread."""
+        if self.page:
+            self.page.close()
+            self.page = None
+        if self.context:
+            self.context.close()
+            self.context = None
         if self.browser:
             self.browser.close()
+            self.browser = None
         if self.playwright:
             self.playwright.stop()
+            self.playwright = None
     
     def detect_site_type(self, url: str) -> str:
         """Detect the e-commerce site type from URL."""
-        domain = urlparse(url).netloc.lower()
-        
         # Support various Amazon domains (amazon.com, amzn.in, amazon.in, etc.)
-        if 'amazon' in domain or 'amzn' in domain:
-            return 'amazon'
-        elif 'flipkart' in domain:
-            return 'flipkart'
-        else:
-            raise ValueError(f"Unsupported site: {domain}")
+        site_type = Config.detect_site(url)
+        if site_type is None:
+            raise ValueError(f"Unsupported site: {urlparse(url).netloc.lower()}")
+        return site_type
     
     def extract_price_from_text(self, price_text: str) -> Optional[float]:
         """Extract numeric price from text containing currency symbols and formatting."""
         if not price_text:
             return None
         
-        # Remove common currency symbols and formatting
-        cleaned = re.sub(r'[^\d.,]', '', price_text.strip())
-        
-        # Handle different number formats
-        if ',' in cleaned and '.' in cleaned:
-            # Format like "1,234.56"
-            cleaned = cleaned.replace(',', '')
-        elif ',' in cleaned:
-            # Format like "1,234" or "1,234,567"
-            if cleaned.count(',') == 1 and len(cleaned.split(',')[1]) == 3:
-                # Likely "1,234" format
-                cleaned = cleaned.replace(',', '')
-            else:
-                # Likely "1,234,567" format
-                cleaned = cleaned.replace(',', '')
+        # Prefer the first currency amount that is not the M.R.P, so "Save 20%" or a
+        # struck-out list price next to the selling price is not picked up
+        amounts = CURRENCY_PRICE_RE.findall(price_text)
+        amount = next((number for label, number in amounts if not label), None) or (amounts[0][1] if amounts else None)
+        if amount is None:
+            # No currency marker; anchored on a digit, so stray dots are skipped
+            match = PRICE_RE.search(price_text)
+            if not match:
+                logger.warning(f"Could not parse price from text: {price_text}")
+                return None
+            amount = match.group()
         
+        # The amount is always a valid float once thousands separators are dropped
+        price = float(amount.replace(',', ''))
+        return price if price > 0 else None
+    
+    def _product_from_json_ld(self, block: bytes) -> Optional[Tuple[str, float]]:
+        """Return (name, price) from a JSON-LD block describing a Product with an offer, if any."""
         try:
-            price = float(cleaned)
-            return price if price > 0 else None
+            pending = [json.loads(block)]
         except ValueError:
-            logger.warning(f"Could not parse price from text: {price_text}")
             return None
+        
+        while pending:
+            item = pending.pop()
+            if isinstance(item, list):
+                pending.extend(item)
+                continue
+            if not isinstance(item, dict):
+                continue
+            pending.extend(item.get('@graph', ()))
+            
+            types = item.get('@type')
+            if types != 'Product' and not (isinstance(types, list) and 'Product' in types):
+                continue
+            
+            offers = item.get('offers')
+            if isinstance(offers, list):
+                offers = offers[0] if offers else None
+            if not isinstance(offers, dict) or not isinstance(item.get('name'), str):
+                continue
+            
+            price = self.extract_price_from_text(str(offers.get('price') or offers.get('lowPrice') or ''))
+            if price:
+                return item['name'].strip(), price
+        
+        return None
     
-    def scrape_with_requests(self, url: str) -> Optional[Dict]:
-        """Scrape product information using requests and BeautifulSoup."""
-        try:
-            logger.info(f"Scraping with requests: {url}")
-            response = self.session.get(url, timeout=Config.REQUEST_TIMEOUT)
-            response.raise_for_status()
+    def _read_until_json_ld(self, response) -> Tuple[bytearray, Optional[Tuple[str, float]]]:
+        """Read at most MAX_PAGE_BYTES of a streamed body, stopping once a JSON-LD Product price arrives."""
+        content = bytearray()
+        scanned = 0
+        
+        for chunk in response.iter_content(chunk_size=16384):
+            # Oversized pages are cut off; the fields we need sit well before the limit
+            content += chunk[:Config.MAX_PAGE_BYTES - len(content)]
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            site_type = self.detect_site_type(url)
+            for match in JSON_LD_RE.finditer(content, scanned):
+                scanned = match.end()
+                json_ld = self._product_from_json_ld(match.group(1))
+                if json_ld:
+                    return content, json_ld
+            
+            # Resume at an unterminated <script>, or just before the end in case a tag was split
+            unterminated = content.rfind(b'<script', scanned)
+            if unterminated != -1 and content.find(b'</script>', unterminated) == -1:
+                scanned = unterminated
+            else:
+                scanned = max(scanned, len(content) - 64)
+            
+            if len(content) >= Config.MAX_PAGE_BYTES:
+                logger.debug(f"Stopped reading {response.url} at {len(content)} bytes")
+                break
+        
+        return content, None
+    
+    def _parse_page(self, content: bytes, site_type: str):
+        """Parse a page once; the returned function yields the text of each selector group's matches in order."""
+        if HTMLParser is not None:
+            # selectolax's C parser, when installed, is much faster than building a soup
+            tree = HTMLParser(content)
             site_config = Config.SUPPORTED_SITES[site_type]
             
-            # Extract product name
-            product_name = None
-            for selector in site_config['title_selectors']:
-                element = soup.select_one(selector)
+            def texts(group):
+                for selector in site_config[group]:
+                    node = tree.css_first(selector)
+                    if node:
+                        yield node.text().strip()
+            return texts
+        
+        soup = BeautifulSoup(content, BS4_PARSER)
+        selectors = COMPILED_SELECTORS[site_type]
+        
+        def texts(group):
+            for selector in selectors[group]:
+                element = selector.select_one(soup)
                 if element:
-                    product_name = element.get_text().strip()
-                    break
+                    yield element.get_text().strip()
+        return texts
+    
+    def _wait_for_host(self, url: str):
+        """Space request starts to one site HOST_REQUEST_DELAY apart, waiting only for the gap left."""
+        host = Config.detect_site(url) or urlparse(url).netloc
+        with self._pacing_lock:
+            now = time.monotonic()
+            start = max(now, self._next_request_at.get(host, now))
+            self._next_request_at[host] = start + Config.HOST_REQUEST_DELAY
+        if start > now:
+            time.sleep(start - now)
+    
+    def scrape_with_requests(self, url: str, site_type: str = None,
+                             etag: str = None, last_modified: str = None) -> Optional[Dict]:
+        """Scrape product information using requests and a static HTML parser.
+        
+        With stored validators the request is conditional; a 304 Not Modified
+        returns {'unchanged': True, ...} without a product name or price.
+        """
+        try:
+            logger.debug(f"Scraping with requests: {url}")
+            site_type = site_type or self.detect_site_type(url)
             
-            # Extract price
-            price = None
-            for selector in site_config['price_selectors']:
-                element = soup.select_one(selector)
-                if element:
-                    price_text = element.get_text().strip()
+            headers = {}
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+            
+            self._wait_for_host(url)
+            with self.session.get(url, headers=headers, timeout=Config.REQUEST_TIMEOUT, stream=True) as response:
+                if response.status_code == 304:
+                    return {
+                        'unchanged': True,
+                        'url': url,
+                        'site_type': site_type,
+                        'etag': response.headers.get('ETag', etag),
+                        'last_modified': response.headers.get('Last-Modified', last_modified)
+                    }
+                response.raise_for_status()
+                content, json_ld = self._read_until_json_ld(response)
+            
+            if json_ld:
+                # Structured data was found, so the rest of the page was never downloaded or parsed
+                product_name, price = json_ld
+            else:
+                texts = self._parse_page(bytes(content), site_type)
+                
+                # Extract product name
+                product_name = next(texts('title_selectors'), None)
+                
+                # Extract price
+                price = None
+                for price_text in texts('price_selectors'):
                     price = self.extract_price_from_text(price_text)
                     if price:
                         break
@@ -121,9 +284,16 @@ class WebScraper:
                 'product_name': product_name,
                 'price': price,
                 'url': url,
-                'site_type': site_type
+                'site_type': site_type,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
             }
             
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in GONE_STATUSES:
+                raise
+            logger.error(f"Request failed for {url}: {e}")
+            return None
         except requests.RequestException as e:
             logger.error(f"Request failed for {url}: {e}")
             return None
@@ -131,30 +301,44 @@ class WebScraper:
             logger.error(f"Error scraping {url}: {e}")
             return None
     
-    def scrape_with_playwright(self, url: str) -> Optional[Dict]:
+    def scrape_with_playwright(self, url: str, site_type: str = None) -> Optional[Dict]:
         """Scrape product information using Playwright for JavaScript-heavy sites."""
+        return self._playwright_executor.submit(self._scrape_with_playwright, url, site_type).result()
+    
+    def _scrape_with_playwright(self, url: str, site_type: str = None) -> Optional[Dict]:
+        """Run a Playwright scrape; always called on the Playwright thread."""
         try:
-            logger.info(f"Scraping with Playwright: {url}")
+            logger.debug(f"Scraping with Playwright: {url}")
             
             if not self.playwright:
+                # Imported here so runs that never need a browser skip Playwright's import cost
+                from playwright.sync_api import sync_playwright
                 self.playwright = sync_playwright().start()
                 self.browser = self.playwright.chromium.launch(headless=True)
+                # One context carries headers and viewport for every page and keeps cookies between scrapes
+                self.context = self.browser.new_context(
+                    extra_http_headers=dict(Config.HEADERS),
+                    viewport={"width": 1920, "height": 1080}
+                )
+                # Prices are plain text in the DOM, so skip images, fonts and stylesheets
+                self.context.route(BLOCKED_RESOURCES, lambda route: route.abort())
             
-            page = self.browser.new_page()
+            # One page is reused for every scrape on this thread
+            if self.page is None or self.page.is_closed():
+                self.page = self.context.new_page()
+            page = self.page
             
-            # Set user agent and viewport
-            page.set_extra_http_headers(Config.HEADERS)
-            page.set_viewport_size({"width": 1920, "height": 1080})
-            
-            # Navigate to the page
-            page.goto(url, wait_until='networkidle', timeout=30000)
-            
-            # Wait for content to load
-            page.wait_for_timeout(3000)
-            
-            site_type = self.detect_site_type(url)
+            site_type = site_type or self.detect_site_type(url)
             site_config = Config.SUPPORTED_SITES[site_type]
             
+            # Navigate to the page and wait only until a price element exists
+            self._wait_for_host(url)
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            try:
+                page.wait_for_selector(', '.join(site_config['price_selectors']), timeout=5000)
+            except Exception:
+                logger.debug(f"No price element appeared on {url}")
+            
             # Extract product name
             product_name = None
             for selector in site_config['title_selectors']:
@@ -179,8 +363,6 @@ class WebScraper:
                 except Exception:
                     continue
             
-            page.close()
-            
             if not product_name:
                 logger.warning(f"Could not extract product name from {url}")
                 return None
@@ -200,8 +382,43 @@ class WebScraper:
             logger.error(f"Error scraping with Playwright {url}: {e}")
             return None
     
-    def scrape_product(self, url: str, use_playwright: bool = False) -> Optional[Dict]:
+    def _cached_result(self, url: str) -> Optional[Dict]:
+        """Return a scrape of url from the last SCRAPE_CACHE_TTL seconds, if any."""
+        with self._result_cache_lock:
+            entry = self._result_cache.get(url)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._result_cache[url]
+                return None
+            self._result_cache.move_to_end(url)
+            return dict(entry[1])
+    
+    def _cache_result(self, url: str, result: Dict):
+        """Remember a successful scrape, evicting the least recently used beyond the size limit."""
+        with self._result_cache_lock:
+            self._result_cache[url] = (time.monotonic() + Config.SCRAPE_CACHE_TTL, dict(result))
+            self._result_cache.move_to_end(url)
+            while len(self._result_cache) > Config.SCRAPE_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def scrape_product(self, url: str, use_playwright: bool = False, bypass_cache: bool = False,
+                       etag: str = None, last_modified: str = None) -> Optional[Dict]:
         """Main method to scrape product information from a URL."""
+        if Config.SCRAPE_CACHE_TTL > 0 and not bypass_cache:
+            cached = self._cached_result(url)
+            if cached:
+                logger.debug(f"Using cached scrape for {url}")
+                return cached
+        
+        result = self._scrape_product(url, use_playwright, etag, last_modified)
+        if result and not result.get('unchanged') and Config.SCRAPE_CACHE_TTL > 0:
+            self._cache_result(url, result)
+        return result
+    
+    def _scrape_product(self, url: str, use_playwright: bool,
+                        etag: str = None, last_modified: str = None) -> Optional[Dict]:
+        """Scrape url with the preferred method, falling back to the other one."""
         try:
             # Validate URL
             if not url.startswith(('http://', 'https://')):
@@ -209,26 +426,28 @@ class WebScraper:
             
             # Detect site type
             site_type = self.detect_site_type(url)
-            logger.info(f"Detected site type: {site_type} for URL: {url}")
+            logger.debug(f"Detected site type: {site_type} for URL: {url}")
             
             # Try scraping with the specified method
             if use_playwright:
-                result = self.scrape_with_playwright(url)
+                result = self.scrape_with_playwright(url, site_type)
                 if result:
                     return result
                 else:
                     # Fallback to requests if Playwright fails
                     logger.info("Playwright failed, trying with requests...")
-                    return self.scrape_with_requests(url)
+                    return self.scrape_with_requests(url, site_type, etag, last_modified)
             else:
-                result = self.scrape_with_requests(url)
+                result = self.scrape_with_requests(url, site_type, etag, last_modified)
                 if result:
                     return result
                 else:
                     # Fallback to Playwright if requests fails
                     logger.info("Requests failed, trying with Playwright...")
-                    return self.scrape_with_playwright(url)
+                    return self.scrape_with_playwright(url, site_type)
                     
+        except requests.HTTPError:
+            raise
         except Exception as e:
             logger.error(f"Error in scrape_product for {url}: {e}")
             return None
@@ -273,33 +492,48 @@ class ScrapingManager:
         """Initialize the scraping manager."""
         self.scraper = WebScraper()
         self.max_retries = 3
-        self.retry_delay = 5  # seconds
+        self.retry_delay = 5  # seconds, doubled after each failed attempt
+        self.max_retry_delay = 30  # seconds
+        # Set by cleanup() so pending retries stop waiting
+        self._cancelled = threading.Event()
     
-    def scrape_with_retry(self, url: str, use_playwright: bool = False) -> Optional[Dict]:
-        """Scrape product with retry logic."""
+    def scrape_with_retry(self, url: str, use_playwright: bool = False, bypass_cache: bool = False,
+                          etag: str = None, last_modified: str = None) -> Optional[Dict]:
+        """Scrape product with retry logic; see scrape_with_requests for the validators."""
+        # An unsupported site fails the same way on every attempt
+        if Config.detect_site(url) is None:
+            logger.error(f"Unsupported site, not scraping: {url}")
+            return None
+        
         for attempt in range(self.max_retries):
             try:
-                logger.info(f"Scraping attempt {attempt + 1}/{self.max_retries} for {url}")
+                logger.debug(f"Scraping attempt {attempt + 1}/{self.max_retries} for {url}")
                 
-                result = self.scraper.scrape_product(url, use_playwright)
+                result = self.scraper.scrape_product(url, use_playwright, bypass_cache, etag, last_modified)
                 
                 if result:
-                    logger.info(f"Successfully scraped {url}: {result['product_name']} - {result['price']}")
+                    logger.debug(f"Successfully scraped {url}: {result.get('product_name')} - {result.get('price')}")
                     return result
                 else:
                     logger.warning(f"Scraping attempt {attempt + 1} failed for {url}")
                     
+            except requests.HTTPError as e:
+                logger.error(f"Product page is gone, not retrying {url}: {e}")
+                return None
             except Exception as e:
                 logger.error(f"Error in scraping attempt {attempt + 1} for {url}: {e}")
             
-            # Wait before retry (except on last attempt)
+            # Exponential backoff with jitter (except on last attempt); returns early once cancelled
             if attempt < self.max_retries - 1:
-                import time
-                time.sleep(self.retry_delay)
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** attempt) + random.random()
+                if self._cancelled.wait(delay):
+                    logger.info(f"Scraping cancelled for {url}")
+                    return None
         
         logger.error(f"All scraping attempts failed for {url}")
         return None
     
     def cleanup(self):
-        """Clean up resources."""
+        """Cancel pending retries and clean up resources."""
+        self._cancelled.set()
         self.scraper.cleanup()
@@ -3,322 +3,346 @@ Command-line interface for the E-commerce Price Tracker & Notifier application.
 Provides easy-to-use commands for managing products and monitoring prices.
 """
 import argparse
+import csv
+import functools
+import os
 import sys
 import logging
+import threading
 from datetime import datetime
-from ..core.price_tracker import PriceTracker
-from ..core.config import Config
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
-def print_banner():
-    """Print application banner."""
-    print("""
+@functools.lru_cache(maxsize=None)
+def _get_config():
+    """Load the configuration and configure logging on first use."""
+    from ..core.config import Config
+    
+    logging.basicConfig(level=Config.LOG_LEVEL_INT)
+    return Config
+
+_tracker_instance = None
+_tracker_lock = threading.Lock()
+
+def _tracker():
+    """Return the shared PriceTracker, creating it on first use."""
+    global _tracker_instance
+    if _tracker_instance is None:
+        with _tracker_lock:
+            if _tracker_instance is None:
+                from ..core.price_tracker import PriceTracker
+                _get_config()
+                _tracker_instance = PriceTracker()
+    return _tracker_instance
+
+def emit(lines):
+    """Write a block of output lines to stdout in a single call."""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+_OK = "✅ ".encode('utf-8')
+_FAIL = "❌ ".encode('utf-8')
+
+def _write_status(prefix: bytes, msg: str):
+    """Write one status line to fd 1 in a single syscall, after any buffered output."""
+    sys.stdout.flush()
+    os.write(1, prefix + msg.encode('utf-8') + b"\n")
+
+def ok(msg: str):
+    """Write a success status line."""
+    _write_status(_OK, msg)
+
+def fail(msg: str):
+    """Write a failure status line."""
+    _write_status(_FAIL, msg)
+
+# Banner pre-encoded once; written straight to the binary buffer
+_BANNER_BYTES = """
 ╔══════════════════════════════════════════════════════════════╗
 ║                🛒 E-commerce Price Tracker & Notifier        ║
 ║                                                              ║
 ║  Monitor Amazon & Flipkart prices, get email notifications  ║
 ║  when prices drop below your threshold!                     ║
 ╚══════════════════════════════════════════════════════════════╝
-    """)
+    \n""".encode('utf-8')
+
+def print_banner():
+    """Print application banner."""
+    sys.stdout.flush()
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        sys.stdout.write(_BANNER_BYTES.decode('utf-8'))
+        return
+    
+    buffer.write(_BANNER_BYTES)
+    buffer.flush()
 
 def add_product_command(args):
     """Add a new product to track."""
-    try:
-        tracker = PriceTracker()
-        
-        print(f"Adding product: {args.url}")
-        print(f"Threshold price: ₹{args.threshold}")
-        
-        result = tracker.add_product(
-            url=args.url,
-            threshold_price=args.threshold,
-            product_name=args.name,
-            check_interval=args.interval
-        )
-        
-        if result['success']:
-            print(f"✅ Successfully added product!")
-            print(f"   Product ID: {result['product_id']}")
-            print(f"   Product Name: {result['product_name']}")
-            print(f"   Current Price: ₹{result['current_price']}")
-            print(f"   Threshold Price: ₹{result['threshold_price']}")
-        else:
-            print(f"❌ Failed to add product: {result['error']}")
-            sys.exit(1)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    print(f"Adding product: {args.url}")
+    print(f"Threshold price: ₹{args.threshold}")
+    
+    result = tracker.add_product(
+        url=args.url,
+        threshold_price=args.threshold,
+        product_name=args.name,
+        check_interval=args.interval
+    )
+    
+    if result['success']:
+        ok("Successfully added product!")
+        print(f"   Product ID: {result['product_id']}")
+        print(f"   Product Name: {result['product_name']}")
+        print(f"   Current Price: ₹{result['current_price']}")
+        print(f"   Threshold Price: ₹{result['threshold_price']}")
+    else:
+        fail(f"Failed to add product: {result['error']}")
+        return 1
+
+# Listing strings built once at import rather than per call or per row
+_STATUS_ACTIVE = sys.intern("🟢 Active")
+_STATUS_INACTIVE = sys.intern("🔴 Inactive")
+_NA = sys.intern("N/A")
+_SEP80 = "=" * 80
+_SEP40 = "-" * 40
+
+# One product block of list-products output, filled from a preformatted row
+_PRODUCT_TPL = (
+    "ID: %s\n"
+    "Name: %s\n"
+    "Price: %s\n"
+    "Threshold: ₹%s\n"
+    "Site: %s\n"
+    "Status: %s\n"
+    "Last Checked: %s\n"
+    + _SEP40
+)
 
 def list_products_command(args):
     """List all tracked products."""
-    try:
-        tracker = PriceTracker()
-        products = tracker.db.get_all_products(active_only=not args.all)
-        
-        if not products:
-            print("No products found.")
-            return
-        
-        print(f"\n📋 Tracked Products ({len(products)} total):")
-        print("=" * 80)
-        
-        for product in products:
-            status = "🟢 Active" if product['is_active'] else "🔴 Inactive"
-            price = f"₹{product['current_price']:.2f}" if product['current_price'] else "N/A"
-            
-            print(f"ID: {product['id']}")
-            print(f"Name: {product['product_name']}")
-            print(f"Price: {price}")
-            print(f"Threshold: ₹{product['threshold_price']:.2f}")
-            print(f"Site: {product['site_type']}")
-            print(f"Status: {status}")
-            print(f"Last Checked: {product['last_checked']}")
-            print("-" * 40)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    rows = tracker.db.get_all_products_formatted(
+        active_only=not args.all,
+        active_label=_STATUS_ACTIVE,
+        inactive_label=_STATUS_INACTIVE,
+        missing=_NA
+    )
+    
+    if not rows:
+        print("No products found.")
+        return
+    
+    buf = [f"\n📋 Tracked Products ({len(rows)} total):", _SEP80]
+    buf.extend(_PRODUCT_TPL % row for row in rows)
+    emit(buf)
 
 def check_product_command(args):
     """Check price for a specific product."""
-    try:
-        tracker = PriceTracker()
-        
-        print(f"Checking price for product ID: {args.product_id}")
-        
-        result = tracker.check_product_price(args.product_id)
-        
-        if result['success']:
-            print(f"✅ Price check completed!")
-            print(f"   Product: {result['product_name']}")
-            print(f"   Old Price: ₹{result['old_price']:.2f}" if result['old_price'] else "   Old Price: N/A")
-            print(f"   New Price: ₹{result['new_price']:.2f}")
-            print(f"   Threshold: ₹{result['threshold_price']:.2f}")
-            
-            if result.get('price_dropped'):
-                print("   🎉 Price drop detected!")
-            else:
-                print("   📊 No price drop")
+    tracker = _tracker()
+    
+    print(f"Checking price for product ID: {args.product_id}")
+    
+    result = tracker.check_product_price(args.product_id)
+    
+    if result['success']:
+        ok("Price check completed!")
+        print(f"   Product: {result['product_name']}")
+        print(f"   Old Price: ₹{result['old_price']:.2f}" if result['old_price'] else "   Old Price: N/A")
+        print(f"   New Price: ₹{result['new_price']:.2f}")
+        print(f"   Threshold: ₹{result['threshold_price']:.2f}")
+        
+        if result.get('price_dropped'):
+            print("   🎉 Price drop detected!")
         else:
-            print(f"❌ Failed to check price: {result['error']}")
-            sys.exit(1)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+            print("   📊 No price drop")
+    else:
+        fail(f"Failed to check price: {result['error']}")
+        return 1
 
 def check_all_command(args):
     """Check prices for all active products."""
-    try:
-        tracker = PriceTracker()
-        
-        print("🔄 Checking prices for all active products...")
-        
-        result = tracker.check_all_products()
-        
-        if result['success']:
-            print(f"✅ Price check completed!")
-            print(f"   Products checked: {result['products_checked']}")
-            print(f"   Price drops found: {result['price_drops']}")
-            
-            if result.get('errors'):
-                print(f"   Errors: {len(result['errors'])}")
-                for error in result['errors']:
-                    print(f"     - {error}")
-        else:
-            print(f"❌ Failed to check prices: {result['error']}")
-            sys.exit(1)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    print("🔄 Checking prices for all active products...")
+    
+    result = tracker.check_all_products(max_workers=args.workers)
+    
+    if result['success']:
+        ok("Price check completed!")
+        print(f"   Products checked: {result['products_checked']}")
+        print(f"   Price drops found: {result['price_drops']}")
+        
+        if result.get('errors'):
+            print(f"   Errors: {len(result['errors'])}")
+            for _, product_name, error in result['errors']:
+                print(f"     - Product {product_name}: {error}")
+    else:
+        fail(f"Failed to check prices: {result['error']}")
+        return 1
 
 def process_notifications_command(args):
     """Process pending notifications."""
-    try:
-        tracker = PriceTracker()
-        
-        print("📧 Processing pending notifications...")
-        
-        result = tracker.process_notifications()
-        
-        if result['success']:
-            print(f"✅ Notifications processed!")
-            print(f"   Notifications: {result['notifications_processed']}")
-            print(f"   Emails sent: {result['emails_sent']}")
-            
-            if result.get('failed_emails', 0) > 0:
-                print(f"   Failed emails: {result['failed_emails']}")
-        else:
-            print(f"❌ Failed to process notifications: {result['error']}")
-            sys.exit(1)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    print("📧 Processing pending notifications...")
+    
+    result = tracker.process_notifications()
+    
+    if result['success']:
+        ok("Notifications processed!")
+        print(f"   Notifications: {result['notifications_processed']}")
+        print(f"   Emails sent: {result['emails_sent']}")
+        
+        if result.get('failed_emails', 0) > 0:
+            print(f"   Failed emails: {result['failed_emails']}")
+    else:
+        fail(f"Failed to process notifications: {result['error']}")
+        return 1
 
 def statistics_command(args):
     """Show application statistics."""
-    try:
-        tracker = PriceTracker()
-        
-        print("📊 Application Statistics:")
-        print("=" * 40)
-        
-        stats = tracker.get_statistics()
-        
-        if 'error' in stats:
-            print(f"❌ Error getting statistics: {stats['error']}")
-            sys.exit(1)
-        
-        db_stats = stats['database_stats']
-        
-        print(f"Active Products: {db_stats['total_products']}")
-        print(f"Products with Drops: {db_stats['products_with_drops']}")
-        print(f"Total Notifications: {db_stats['total_notifications']}")
-        print(f"Average Drop %: {db_stats['avg_drop_percent']:.1f}%")
-        print(f"Pending Notifications: {stats['pending_notifications']}")
-        print(f"Last Check: {stats['last_check']}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    stats = tracker.get_statistics()
+    
+    if 'error' in stats:
+        fail(f"Error getting statistics: {stats['error']}")
+        return 1
+    
+    db_stats = stats['database_stats']
+    
+    emit([
+        "📊 Application Statistics:",
+        "=" * 40,
+        f"Active Products: {db_stats['total_products']}",
+        f"Products with Drops: {db_stats['products_with_drops']}",
+        f"Total Notifications: {db_stats['total_notifications']}",
+        f"Average Drop %: {db_stats['avg_drop_percent']:.1f}%",
+        f"Pending Notifications: {stats['pending_notifications']}",
+        f"Last Check: {stats['last_check']}",
+    ])
 
 def test_scraping_command(args):
     """Test scraping for a URL."""
-    try:
-        tracker = PriceTracker()
-        
-        print(f"🧪 Testing scraping for: {args.url}")
-        
-        result = tracker.test_scraping(args.url)
-        
-        if 'error' in result:
-            print(f"❌ Error: {result['error']}")
-            sys.exit(1)
-        
-        print("📋 Test Results:")
-        print("=" * 30)
-        
-        # Requests method
-        if result['requests_method']:
-            req_data = result['requests_method']
-            print(f"✅ Requests Method: Success")
-            print(f"   Product: {req_data['product_name']}")
-            print(f"   Price: ₹{req_data['price']}")
-        else:
-            print("❌ Requests Method: Failed")
-        
-        # Playwright method
-        if result['playwright_method']:
-            play_data = result['playwright_method']
-            print(f"✅ Playwright Method: Success")
-            print(f"   Product: {play_data['product_name']}")
-            print(f"   Price: ₹{play_data['price']}")
-        else:
-            print("❌ Playwright Method: Failed")
-        
-        print(f"🎯 Recommended Method: {result['recommended_method']}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    print(f"🧪 Testing scraping for: {args.url}")
+    
+    result = tracker.test_scraping(args.url)
+    
+    if 'error' in result:
+        fail(f"Error: {result['error']}")
+        return 1
+    
+    buf = ["📋 Test Results:", "=" * 30]
+    
+    # Requests method
+    if result['requests_method']:
+        req_data = result['requests_method']
+        buf.append("✅ Requests Method: Success")
+        buf.append(f"   Product: {req_data['product_name']}")
+        buf.append(f"   Price: ₹{req_data['price']}")
+    else:
+        buf.append("❌ Requests Method: Failed")
+    
+    # Playwright method
+    if result['playwright_method']:
+        play_data = result['playwright_method']
+        buf.append("✅ Playwright Method: Success")
+        buf.append(f"   Product: {play_data['product_name']}")
+        buf.append(f"   Price: ₹{play_data['price']}")
+    else:
+        buf.append("❌ Playwright Method: Failed")
+    
+    buf.append(f"🎯 Recommended Method: {result['recommended_method']}")
+    emit(buf)
 
 def test_email_command(args):
     """Test email configuration."""
-    try:
-        tracker = PriceTracker()
-        
-        print("📧 Testing email configuration...")
-        
-        result = tracker.test_email_configuration()
-        
-        if 'error' in result:
-            print(f"❌ Error: {result['error']}")
-            sys.exit(1)
-        
-        print("📋 Email Test Results:")
-        print("=" * 25)
-        
-        print(f"Configuration: {'✅ Valid' if result['config_valid'] else '❌ Invalid'}")
-        print(f"SMTP Connection: {'✅ Success' if result['smtp_connection'] else '❌ Failed'}")
-        print(f"Authentication: {'✅ Success' if result['authentication'] else '❌ Failed'}")
-        print(f"Test Email: {'✅ Sent' if result['test_email_sent'] else '❌ Failed'}")
-        
-        if result['test_email_sent']:
-            print("\n✅ Email configuration is working correctly!")
-        else:
-            print("\n❌ Email configuration needs attention.")
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+    tracker = _tracker()
+    
+    print("📧 Testing email configuration...")
+    
+    result = tracker.test_email_configuration()
+    
+    if 'error' in result:
+        fail(f"Error: {result['error']}")
+        return 1
+    
+    buf = [
+        "📋 Email Test Results:",
+        "=" * 25,
+        f"Configuration: {'✅ Valid' if result['config_valid'] else '❌ Invalid'}",
+        f"SMTP Connection: {'✅ Success' if result['smtp_connection'] else '❌ Failed'}",
+        f"Authentication: {'✅ Success' if result['authentication'] else '❌ Failed'}",
+        f"Test Email: {'✅ Sent' if result['test_email_sent'] else '❌ Failed'}",
+    ]
+    
+    if result['test_email_sent']:
+        buf.append("\n✅ Email configuration is working correctly!")
+    else:
+        buf.append("\n❌ Email configuration needs attention.")
+    emit(buf)
 
 def export_history_command(args):
     """Export price history for a product."""
-    try:
-        tracker = PriceTracker()
-        
-        print(f"📊 Exporting price history for product ID: {args.product_id}")
-        
-        result = tracker.export_price_history(args.product_id, format=args.format)
-        
-        if result['success']:
-            if args.format == 'csv':
-                filename = result['filename']
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(result['data'])
-                print(f"✅ Price history exported to: {filename}")
-            else:
-                print("📋 Price History Data:")
-                print("=" * 30)
-                for entry in result['data']:
-                    print(f"{entry['timestamp']}: ₹{entry['price']:.2f}")
+    tracker = _tracker()
+    
+    print(f"📊 Exporting price history for product ID: {args.product_id}")
+    
+    result = tracker.export_price_history(args.product_id, format=args.format)
+    
+    if result['success']:
+        if result['format'] == 'csv':
+            filename = result['filename']
+            with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 16) as f:
+                csv.writer(f).writerows(result['data'])
+            ok(f"Price history exported to: {filename}")
         else:
-            print(f"❌ Failed to export history: {result['error']}")
-            sys.exit(1)
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+            buf = ["📋 Price History Data:", "=" * 30]
+            for entry in result['data']:
+                buf.append(f"{entry['timestamp']}: ₹{entry['price']:.2f}")
+            emit(buf)
+    else:
+        fail(f"Failed to export history: {result['error']}")
+        return 1
 
 def delete_product_command(args):
     """Delete/deactivate a product."""
-    try:
-        tracker = PriceTracker()
-        
-        print(f"🗑️  Deactivating product ID: {args.product_id}")
-        
-        # Get product info first
+    tracker = _tracker()
+    
+    print(f"🗑️  Deactivating product ID: {args.product_id}")
+    
+    if not args.force:
+        # The confirmation prompt needs the product info first
         product = tracker.db.get_product_by_id(args.product_id)
         if not product:
-            print(f"❌ Product with ID {args.product_id} not found")
-            sys.exit(1)
+            fail(f"Product with ID {args.product_id} not found")
+            return 1
         
         print(f"Product: {product['product_name']}")
         
-        if not args.force:
-            confirm = input("Are you sure you want to deactivate this product? (y/N): ")
-            if confirm.lower() != 'y':
-                print("Operation cancelled.")
-                return
-        
-        tracker.db.deactivate_product(args.product_id)
-        print(f"✅ Product '{product['product_name']}' deactivated successfully!")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
+        confirm = input("Are you sure you want to deactivate this product? (y/N): ")
+        if confirm.lower() != 'y':
+            print("Operation cancelled.")
+            return
+    
+    # One transaction both deactivates the product and fetches its name
+    product_name = tracker.db.deactivate_product_returning(args.product_id)
+    if product_name is None:
+        fail(f"Product with ID {args.product_id} not found")
+        return 1
+    
+    if args.force:
+        print(f"Product: {product_name}")
+    ok(f"Product '{product_name}' deactivated successfully!")
 
 def start_daemon_command(args):
     """Start the price tracker daemon."""
+    tracker = _tracker()
+    
     try:
-        tracker = PriceTracker()
-        
         print("🚀 Starting Price Tracker Daemon...")
         print("Press Ctrl+C to stop")
         print("=" * 50)
@@ -329,80 +353,108 @@ def start_daemon_command(args):
         print("\n🛑 Stopping Price Tracker...")
         tracker.stop_scheduler()
         print("✅ Price Tracker stopped successfully")
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        sys.exit(1)
 
-def main():
-    """Main CLI function."""
-    parser = argparse.ArgumentParser(
-        description="E-commerce Price Tracker & Notifier CLI",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+def _add_product_parser(subparsers):
+    parser = subparsers.add_parser('add-product', help='Add a new product to track')
+    parser.add_argument('url', help='Product URL (Amazon or Flipkart)')
+    parser.add_argument('threshold', type=float, help='Threshold price')
+    parser.add_argument('--name', help='Product name (optional)')
+    parser.add_argument('--interval', type=int, help='Check interval in seconds (optional)')
+    return parser
+
+def _list_products_parser(subparsers):
+    parser = subparsers.add_parser('list-products', help='List all tracked products')
+    parser.add_argument('--all', action='store_true', help='Show inactive products too')
+    return parser
+
+def _check_product_parser(subparsers):
+    parser = subparsers.add_parser('check-product', help='Check price for a specific product')
+    parser.add_argument('product_id', type=int, help='Product ID')
+    return parser
+
+def _check_all_parser(subparsers):
+    parser = subparsers.add_parser('check-all', help='Check prices for all active products')
+    parser.add_argument('--workers', type=int, help='Number of products to check concurrently (default: MAX_CONCURRENT_CHECKS)')
+    return parser
+
+def _process_notifications_parser(subparsers):
+    return subparsers.add_parser('process-notifications', help='Process pending notifications')
+
+def _statistics_parser(subparsers):
+    return subparsers.add_parser('statistics', help='Show application statistics')
+
+def _test_scraping_parser(subparsers):
+    parser = subparsers.add_parser('test-scraping', help='Test scraping for a URL')
+    parser.add_argument('url', help='URL to test')
+    return parser
+
+def _test_email_parser(subparsers):
+    return subparsers.add_parser('test-email', help='Test email configuration')
+
+def _export_history_parser(subparsers):
+    parser = subparsers.add_parser('export-history', help='Export price history for a product')
+    parser.add_argument('product_id', type=int, help='Product ID')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='Export format')
+    return parser
+
+def _delete_product_parser(subparsers):
+    parser = subparsers.add_parser('delete-product', help='Deactivate a product')
+    parser.add_argument('product_id', type=int, help='Product ID')
+    parser.add_argument('--force', action='store_true', help='Skip confirmation')
+    return parser
+
+def _start_daemon_parser(subparsers):
+    return subparsers.add_parser('start-daemon', help='Start the price tracker daemon')
+
+# Command name -> (subparser builder, handler), in help order
+COMMANDS = {
+    'add-product': (_add_product_parser, add_product_command),
+    'list-products': (_list_products_parser, list_products_command),
+    'check-product': (_check_product_parser, check_product_command),
+    'check-all': (_check_all_parser, check_all_command),
+    'process-notifications': (_process_notifications_parser, process_notifications_command),
+    'statistics': (_statistics_parser, statistics_command),
+    'test-scraping': (_test_scraping_parser, test_scraping_command),
+    'test-email': (_test_email_parser, test_email_command),
+    'export-history': (_export_history_parser, export_history_command),
+    'delete-product': (_delete_product_parser, delete_product_command),
+    'start-daemon': (_start_daemon_parser, start_daemon_command),
+}
+
+_EPILOG = """
 Examples:
   %(prog)s add-product "https://amazon.in/product" 999.99
   %(prog)s list-products
   %(prog)s check-all
   %(prog)s start-daemon
         """
-    )
+
+def build_parser(command=None):
+    """Build the CLI parser, only adding the subparser for a known command."""
+    # Help, no-args and unknown commands get the full parser with the examples epilog
+    full = command not in COMMANDS
+    
+    if full:
+        parser = argparse.ArgumentParser(
+            description="E-commerce Price Tracker & Notifier CLI",
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog=_EPILOG
+        )
+    else:
+        parser = argparse.ArgumentParser(description="E-commerce Price Tracker & Notifier CLI")
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
-    # Add product command
-    add_parser = subparsers.add_parser('add-product', help='Add a new product to track')
-    add_parser.add_argument('url', help='Product URL (Amazon or Flipkart)')
-    add_parser.add_argument('threshold', type=float, help='Threshold price')
-    add_parser.add_argument('--name', help='Product name (optional)')
-    add_parser.add_argument('--interval', type=int, help='Check interval in seconds (optional)')
-    add_parser.set_defaults(func=add_product_command)
-    
-    # List products command
-    list_parser = subparsers.add_parser('list-products', help='List all tracked products')
-    list_parser.add_argument('--all', action='store_true', help='Show inactive products too')
-    list_parser.set_defaults(func=list_products_command)
-    
-    # Check product command
-    check_parser = subparsers.add_parser('check-product', help='Check price for a specific product')
-    check_parser.add_argument('product_id', type=int, help='Product ID')
-    check_parser.set_defaults(func=check_product_command)
-    
-    # Check all command
-    check_all_parser = subparsers.add_parser('check-all', help='Check prices for all active products')
-    check_all_parser.set_defaults(func=check_all_command)
-    
-    # Process notifications command
-    notify_parser = subparsers.add_parser('process-notifications', help='Process pending notifications')
-    notify_parser.set_defaults(func=process_notifications_command)
-    
-    # Statistics command
-    stats_parser = subparsers.add_parser('statistics', help='Show application statistics')
-    stats_parser.set_defaults(func=statistics_command)
-    
-    # Test scraping command
-    test_scrape_parser = subparsers.add_parser('test-scraping', help='Test scraping for a URL')
-    test_scrape_parser.add_argument('url', help='URL to test')
-    test_scrape_parser.set_defaults(func=test_scraping_command)
-    
-    # Test email command
-    test_email_parser = subparsers.add_parser('test-email', help='Test email configuration')
-    test_email_parser.set_defaults(func=test_email_command)
-    
-    # Export history command
-    export_parser = subparsers.add_parser('export-history', help='Export price history for a product')
-    export_parser.add_argument('product_id', type=int, help='Product ID')
-    export_parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='Export format')
-    export_parser.set_defaults(func=export_history_command)
-    
-    # Delete product command
-    delete_parser = subparsers.add_parser('delete-product', help='Deactivate a product')
-    delete_parser.add_argument('product_id', type=int, help='Product ID')
-    delete_parser.add_argument('--force', action='store_true', help='Skip confirmation')
-    delete_parser.set_defaults(func=delete_product_command)
-    
-    # Start daemon command
-    daemon_parser = subparsers.add_parser('start-daemon', help='Start the price tracker daemon')
-    daemon_parser.set_defaults(func=start_daemon_command)
+    names = COMMANDS if full else (command,)
+    for name in names:
+        build, handler = COMMANDS[name]
+        build(subparsers).set_defaults(func=handler)
+    
+    return parser
+
+def main():
+    """Main CLI function."""
+    parser = build_parser(sys.argv[1] if len(sys.argv) > 1 else None)
     
     args = parser.parse_args()
     
@@ -411,11 +463,14 @@ Examples:
         parser.print_help()
         return
     
+    # Single error boundary for every command; handlers return their exit code
     try:
-        args.func(args)
+        status = args.func(args)
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        print(f"❌ Error: {e}", file=sys.stderr)
         sys.exit(1)
+    
+    sys.exit(status or 0)
 
 if __name__ == "__main__":
     main()
@@ -4,8 +4,8 @@ Tests core functionality without requiring external dependencies.
 """
 import sys
 import os
-import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add current directory to path for imports
@@ -18,11 +18,8 @@ def test_database():
     try:
         from ..core.database import DatabaseManager
         
-        # Use temporary database for testing
-        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
-            db_path = tmp.name
-        
-        db = DatabaseManager(db_path)
+        # In-memory database: no files, fsyncs or cleanup
+        db = DatabaseManager(':memory:')
         
         # Test adding a product
         product_id = db.add_product(
@@ -41,6 +38,12 @@ def test_database():
         assert products[0]['product_name'] == "Test Product"
         print("✅ Database get_all_products test passed")
         
+        # Worker threads open their own connections; they must see the same database
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            products = executor.submit(db.get_all_products).result()
+        assert len(products) == 1, "Another thread should see the same products"
+        print("✅ Database cross-thread read test passed")
+        
         # Test updating price
         db.update_product_price(product_id, 899.99)
         product = db.get_product_by_id(product_id)
@@ -68,8 +71,6 @@ def test_database():
         assert 'total_products' in stats
         print("✅ Database statistics test passed")
         
-        # Cleanup
-        os.unlink(db_path)
         print("✅ Database tests completed successfully")
         
     except Exception as e:
@@ -127,6 +128,16 @@ def test_scraper():
         
         price = scraper.extract_price_from_text("1,234.56")
         assert price == 1234.56
+        
+        # Text with several numbers resolves to the selling price
+        price = scraper.extract_price_from_text("M.R.P ₹2,999 ₹1,999")
+        assert price == 1999.0
+        
+        price = scraper.extract_price_from_text("Save 20% ₹1,999")
+        assert price == 1999.0
+        
+        price = scraper.extract_price_from_text("Rs. 1,499.00")
+        assert price == 1499.0
         print("✅ Price extraction test passed")
         
         # Test unsupported site
@@ -186,14 +197,10 @@ def test_price_tracker():
     try:
         from ..core.price_tracker import PriceTracker
         
-        # Use temporary database
-        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
-            db_path = tmp.name
-        
-        # Temporarily modify config to use test database
+        # Temporarily modify config to use an in-memory test database
         import config
         original_db_path = config.Config.DATABASE_PATH
-        config.Config.DATABASE_PATH = db_path
+        config.Config.DATABASE_PATH = ':memory:'
         
         tracker = PriceTracker()
         
@@ -211,8 +218,6 @@ def test_price_tracker():
         # Restore original config
         config.Config.DATABASE_PATH = original_db_path
         
-        # Cleanup
-        os.unlink(db_path)
         print("✅ Price tracker tests completed successfully")
         
     except Exception as e:
@@ -3,17 +3,22 @@ Simplified web dashboard for the E-commerce Price Tracker & Notifier application
 Uses external HTML templates instead of embedding them in Python code.
 """
 
-import json
+import csv
+import functools
+import hashlib
 import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, g, make_response, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup, escape
 import io
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import plotly.graph_objs as go
-import plotly.utils
-import pandas as pd
+import plotly.io as pio
 import os
 
 # Add parent directory to path for imports
@@ -24,40 +29,358 @@ from core.price_tracker import PriceTracker
 from core.config import Config
 
 # Configure logging
-logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL))
+logging.basicConfig(level=Config.LOG_LEVEL_INT)
 logger = logging.getLogger(__name__)
 
+# Serialize API responses with orjson when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.debug("orjson not installed, using the standard json encoder")
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, keeping the default provider's sorted keys."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
 app = Flask(__name__, 
            template_folder='../../templates',  # Point to templates directory
            static_folder='../../static')       # Point to static directory
 CORS(app)
 
+# Keep compiled templates on disk so restarts and extra workers skip the Jinja compile step;
+# JINJA_CACHE_DIR picks the directory, otherwise Jinja uses a per-user one under the temp dir
+try:
+    if Config.JINJA_CACHE_DIR:
+        os.makedirs(Config.JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory=Config.JINJA_CACHE_DIR or None)
+except (OSError, RuntimeError) as e:
+    logger.warning("Template bytecode cache disabled, cache directory unusable: %s", e)
+# Set in config too, or a later change to app.debug would switch reloading back on
+app.config['TEMPLATES_AUTO_RELOAD'] = Config.DASHBOARD_DEBUG
+app.jinja_env.auto_reload = Config.DASHBOARD_DEBUG
+
+# Compile both templates at import so the first request doesn't pay for it
+for _template_name in ('dashboard.html', 'error.html'):
+    app.jinja_env.get_template(_template_name)
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+# Compress JSON, CSV and HTML responses when Flask-Compress is installed
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+    logger.debug("flask-compress not installed, responses are sent uncompressed")
+
+if Compress:
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/csv', 'text/html']
+    app.config['COMPRESS_LEVEL'] = 5
+    Compress(app)
+
 # Initialize price tracker
 tracker = PriceTracker()
 
+# Short-lived cache of rendered GET responses, keyed on path + query string
+_view_cache = {}
+_view_cache_lock = threading.Lock()
+
+def _is_failure(response):
+    """True for JSON bodies reporting an error, which must not be served again from the cache."""
+    if not response.is_json:
+        return False
+    payload = response.get_json(silent=True)
+    return isinstance(payload, dict) and (payload.get('success') is False or 'error' in payload)
+
+def cached_view(timeout=None, watermark=None):
+    """Cache a view's successful responses for `timeout` seconds (DASHBOARD_CACHE_TTL by default).
+    
+    watermark(*args, **kwargs), if given, is part of the key, so a new value misses the cache
+    even when the data was changed by another process.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            ttl = Config.DASHBOARD_CACHE_TTL if timeout is None else timeout
+            key = request.full_path if watermark is None else (request.full_path, watermark(*args, **kwargs))
+            now = time.monotonic()
+            
+            with _view_cache_lock:
+                entry = _view_cache.get(key)
+            if entry and entry[0] > now:
+                return app.response_class(entry[1], status=entry[2], headers=entry[3])
+            
+            response = make_response(view(*args, **kwargs))
+            if ttl > 0 and response.status_code == 200 and not response.is_streamed and not _is_failure(response):
+                entry = (now + ttl, response.get_data(), response.status_code, list(response.headers))
+                with _view_cache_lock:
+                    if len(_view_cache) >= 512:
+                        for stale in [k for k, v in list(_view_cache.items()) if v[0] <= now]:
+                            _view_cache.pop(stale, None)
+                    _view_cache[key] = entry
+            return response
+        return wrapper
+    return decorator
+
+def _latest_price_timestamp(product_id):
+    """Watermark for per-product history views: changes with every new price record."""
+    return tracker.db.get_latest_price_timestamp(product_id)
+
+def _change_summary(*args, **kwargs):
+    """Watermark for whole-table views; reuses the summary etag_view already read for this request."""
+    if 'change_summary' not in g:
+        g.change_summary = tracker.db.get_change_summary()
+    return g.change_summary
+
+def invalidate_view_cache():
+    """Drop every cached response after data changes."""
+    with _view_cache_lock:
+        _view_cache.clear()
+
+def etag_view(view):
+    """Answer If-None-Match with 304 when the data summary is unchanged, before running the view.
+    
+    Stack it on cached_view(watermark=_change_summary) so a cached body always matches its ETag.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        summary = _change_summary()
+        etag = hashlib.blake2b(repr(summary).encode('utf-8'), digest_size=8).hexdigest() if summary else None
+        
+        if etag and request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if not etag or response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, must-revalidate'
+        return response
+    return wrapper
+
+# Long-running actions run here so requests return immediately with a task id
+_task_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard-task')
+_tasks = {}
+_tasks_lock = threading.Lock()
+_running_task_ids = {}
+MAX_TRACKED_TASKS = 100
+
+def _task_finished(future):
+    """Invalidate cached views once a background task has changed data."""
+    if not future.cancelled() and future.exception() is None and future.result().get('success'):
+        invalidate_view_cache()
+
+def submit_task(fn, *args, key=None):
+    """Run fn in the background and return the id to poll it with."""
+    with _tasks_lock:
+        # Repeat submissions under the same key join the unfinished run instead of starting another
+        running_id = _running_task_ids.get(key)
+        if key and running_id in _tasks and not _tasks[running_id].done():
+            return running_id
+        
+        # Forget the oldest finished tasks once too many are tracked
+        if len(_tasks) >= MAX_TRACKED_TASKS:
+            for old_id in [tid for tid, f in _tasks.items() if f.done()][:len(_tasks) - MAX_TRACKED_TASKS + 1]:
+                _tasks.pop(old_id, None)
+        
+        task_id = uuid.uuid4().hex
+        future = _task_executor.submit(fn, *args)
+        future.add_done_callback(_task_finished)
+        _tasks[task_id] = future
+        if key:
+            _running_task_ids[key] = task_id
+        return task_id
+
+# Each test email opens an SMTP session, so allow at most one per interval
+TEST_EMAIL_MIN_INTERVAL = 5  # seconds
+_test_email_lock = threading.Lock()
+_last_test_email = 0.0
+
+# One products-table row; escaped values are filled in with a single format pass
+_ROW_TPL = (
+    '<tr data-product-id="{id}" data-active="{is_active}">'
+    '<td>{product_name}</td>'
+    '<td class="current-price">₹{current_price:.2f}</td>'
+    '<td>₹{threshold_price:.2f}</td>'
+    '<td><span class="badge bg-primary">{site_type}</span></td>'
+    '<td class="last-checked">{last_checked}</td>'
+    '<td>{status}</td>'
+    '<td>'
+    '<button class="btn btn-sm btn-outline-primary" onclick="checkProduct({id})"><i class="fas fa-sync"></i></button> '
+    '<button class="btn btn-sm btn-outline-info" onclick="viewChart({id})"><i class="fas fa-chart-line"></i></button> '
+    '<button class="btn btn-sm btn-outline-success" onclick="exportHistory({id})"><i class="fas fa-download"></i></button> '
+    '<button class="btn btn-sm btn-outline-danger" onclick="deleteProduct({id})"><i class="fas fa-trash"></i></button>'
+    '</td>'
+    '</tr>'
+)
+_STATUS_ACTIVE_HTML = '<span class="badge bg-success">Active</span>'
+_STATUS_INACTIVE_HTML = '<span class="badge bg-secondary">Inactive</span>'
+
+def render_product_rows(products):
+    """Render the products table body as one HTML string."""
+    return Markup(''.join(
+        _ROW_TPL.format(
+            id=int(product['id']),
+            product_name=escape(product['product_name']),
+            current_price=product['current_price'] or 0,
+            threshold_price=product['threshold_price'],
+            site_type=escape(product['site_type']),
+            last_checked=escape(product['last_checked']),
+            is_active=int(bool(product['is_active'])),
+            status=_STATUS_ACTIVE_HTML if product['is_active'] else _STATUS_INACTIVE_HTML
+        )
+        for product in products
+    ))
+
+# Long histories are downsampled before charting
+CHART_DOWNSAMPLE_THRESHOLD = 800
+CHART_MAX_POINTS = 500
+
+# History views are keyed on the newest price record, so they can be kept longer
+CHART_CACHE_TTL = 300  # seconds
+
+# plotly.js only understands expanded templates, so resolve 'plotly_white' once
+CHART_TEMPLATE = pio.templates['plotly_white'].to_plotly_json()
+
+# Fixed parts of the price chart, shared by every response and never mutated
+CHART_LAYOUT = {
+    'title': {'text': 'Price History'},
+    'xaxis': {'title': {'text': 'Date'}},
+    'yaxis': {'title': {'text': 'Price (₹)'}},
+    'hovermode': 'closest',
+    'template': CHART_TEMPLATE
+}
+CHART_LINE_STYLE = {'color': '#007bff', 'width': 2}
+CHART_MARKER_STYLE = {'size': 6}
+
+def lttb_indices(xs, ys, n_out):
+    """Pick n_out point indices with Largest-Triangle-Three-Buckets downsampling."""
+    n = len(xs)
+    if n_out >= n or n_out < 3:
+        return list(range(n))
+    
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    
+    for i in range(n_out - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+        
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        next_a = range_start = int(i * every) + 1
+        for j in range(range_start, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+        
+        selected.append(next_a)
+        a = next_a
+    
+    selected.append(n - 1)
+    return selected
+
+def render_price_svg(timestamps, prices, width=600, height=200, pad=8):
+    """Render a price history as a static SVG line, time on x and price on y."""
+    seconds = [datetime.fromisoformat(ts).timestamp() for ts in timestamps]
+    x0, y0 = seconds[0], min(prices)
+    # A single point or a flat price would otherwise divide by zero
+    x_scale = (width - 2 * pad) / ((seconds[-1] - x0) or 1)
+    y_scale = (height - 2 * pad) / ((max(prices) - y0) or 1)
+    points = ' '.join(
+        f'{pad + (x - x0) * x_scale:.1f},{height - pad - (y - y0) * y_scale:.1f}'
+        for x, y in zip(seconds, prices)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="{width}" height="{height}">'
+        f'<polyline fill="none" stroke="{CHART_LINE_STYLE["color"]}" stroke-width="{CHART_LINE_STYLE["width"]}" points="{points}"/>'
+        '</svg>'
+    )
+
+@functools.lru_cache(maxsize=32)
+def static_version(filename):
+    """Short content hash of a static file, so its URL changes whenever the file does."""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """Append ?v=<content hash> to url_for('static', ...) links."""
+    if endpoint == 'static' and 'filename' in values and not Config.DASHBOARD_DEBUG:
+        try:
+            values.setdefault('v', static_version(values['filename']))
+        except OSError:
+            pass
+
+@app.after_request
+def cache_versioned_static(response):
+    """Let browsers keep ?v=<hash> static files for a year; the URL changes with the content."""
+    if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+@functools.lru_cache(maxsize=1)
+def _dashboard_shell():
+    """Render the data-free dashboard page once per process, already encoded."""
+    return render_template('dashboard.html').encode('utf-8')
+
 @app.route('/')
 def index():
-    """Main dashboard page."""
+    """Main dashboard page; statistics and products are loaded by /api/dashboard-bootstrap."""
+    try:
+        if Config.DASHBOARD_DEBUG:
+            return render_template('dashboard.html')
+        return app.response_class(_dashboard_shell(), mimetype='text/html')
+    except Exception as e:
+        logger.error("Error loading dashboard: %s", e)
+        return render_template('error.html', error=str(e))
+
+@app.route('/api/dashboard-bootstrap')
+@cached_view(watermark=_change_summary)
+def dashboard_bootstrap():
+    """API endpoint with everything the dashboard page needs to populate itself."""
     try:
-        # Get statistics
         stats = tracker.get_statistics()
+        if 'error' in stats:
+            return jsonify({'success': False, 'error': stats['error']})
         
-        # Get all products
         products = tracker.db.get_all_products(active_only=False)
         
-        return render_template('dashboard.html', stats=stats, products=products)
+        return jsonify({'success': True, 'stats': stats, 'rows_html': str(render_product_rows(products))})
     except Exception as e:
-        logger.error(f"Error loading dashboard: {e}")
-        return render_template('error.html', error=str(e))
+        logger.error("Error loading dashboard data: %s", e)
+        return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products', methods=['GET'])
+@etag_view
+@cached_view(watermark=_change_summary)
 def get_products():
     """API endpoint to get all products."""
     try:
         products = tracker.db.get_all_products(active_only=False)
-        return jsonify({'success': True, 'products': products})
+        return jsonify({'success': True, 'products': [dict(product) for product in products]})
     except Exception as e:
-        logger.error(f"Error getting products: {e}")
+        logger.error("Error getting products: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products', methods=['POST'])
@@ -76,9 +399,12 @@ def add_product():
             check_interval=data.get('check_interval')
         )
         
+        if result['success']:
+            invalidate_view_cache()
+        
         return jsonify(result)
     except Exception as e:
-        logger.error(f"Error adding product: {e}")
+        logger.error("Error adding product: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products/<int:product_id>', methods=['DELETE'])
@@ -86,9 +412,10 @@ def delete_product(product_id):
     """API endpoint to deactivate a product."""
     try:
         tracker.db.deactivate_product(product_id)
+        invalidate_view_cache()
         return jsonify({'success': True})
     except Exception as e:
-        logger.error(f"Error deleting product: {e}")
+        logger.error("Error deleting product: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products/<int:product_id>/check', methods=['POST'])
@@ -96,61 +423,65 @@ def check_product(product_id):
     """API endpoint to manually check a product's price."""
     try:
         result = tracker.check_product_price(product_id)
+        if result['success']:
+            invalidate_view_cache()
         return jsonify(result)
     except Exception as e:
-        logger.error(f"Error checking product: {e}")
+        logger.error("Error checking product: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products/<int:product_id>/history')
+@cached_view(timeout=CHART_CACHE_TTL, watermark=_latest_price_timestamp)
 def get_price_history(product_id):
     """API endpoint to get price history for a product."""
     try:
         days = request.args.get('days', 30, type=int)
         history = tracker.db.get_price_history(product_id, days=days)
-        return jsonify({'success': True, 'history': history})
+        return jsonify({'success': True, 'history': [dict(entry) for entry in history]})
     except Exception as e:
-        logger.error(f"Error getting price history: {e}")
+        logger.error("Error getting price history: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products/<int:product_id>/chart')
+@cached_view(timeout=CHART_CACHE_TTL, watermark=_latest_price_timestamp)
 def get_price_chart(product_id):
-    """API endpoint to get price history chart data."""
+    """API endpoint to get price history chart data, or a static SVG chart with ?format=svg."""
     try:
         days = request.args.get('days', 30, type=int)
-        history = tracker.db.get_price_history(product_id, days=days)
+        # Columns come back already ordered by timestamp; Plotly parses the timestamp strings
+        timestamps, prices = tracker.db.get_price_history_columns(product_id, days=days)
         
-        if not history:
+        if not timestamps:
             return jsonify({'success': False, 'error': 'No price history available'})
         
-        # Convert to pandas DataFrame for easier manipulation
-        df = pd.DataFrame(history)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        if len(timestamps) > CHART_DOWNSAMPLE_THRESHOLD:
+            seconds = [datetime.fromisoformat(ts).timestamp() for ts in timestamps]
+            keep = lttb_indices(seconds, prices, CHART_MAX_POINTS)
+            timestamps = [timestamps[i] for i in keep]
+            prices = [prices[i] for i in keep]
         
-        # Create Plotly chart
-        trace = go.Scatter(
-            x=df['timestamp'],
-            y=df['price'],
-            mode='lines+markers',
-            name='Price',
-            line=dict(color='#007bff', width=2),
-            marker=dict(size=6)
-        )
+        # ?format=svg: a static line rendered here, for callers that don't need Plotly's interactivity
+        if request.args.get('format') == 'svg':
+            return Response(render_price_svg(timestamps, prices), mimetype='image/svg+xml')
         
-        layout = go.Layout(
-            title='Price History',
-            xaxis=dict(title='Date'),
-            yaxis=dict(title='Price (₹)'),
-            hovermode='closest',
-            template='plotly_white'
-        )
+        # Plain figure dict: skips go.Figure's per-property validation
+        fig = {
+            'data': [{
+                'type': 'scatter',
+                'x': timestamps,
+                'y': prices,
+                'mode': 'lines+markers',
+                'name': 'Price',
+                'line': CHART_LINE_STYLE,
+                'marker': CHART_MARKER_STYLE
+            }],
+            'layout': CHART_LAYOUT
+        }
         
-        fig = go.Figure(data=[trace], layout=layout)
-        chart_json = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-        
-        return jsonify({'success': True, 'chart': chart_json})
+        # Figure dict is encoded once by the JSON provider; the client uses it as-is
+        return jsonify({'success': True, 'chart': fig})
     except Exception as e:
-        logger.error(f"Error generating chart: {e}")
+        logger.error("Error generating chart: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/products/<int:product_id>/export')
@@ -163,53 +494,79 @@ def export_price_history(product_id):
         if not result['success']:
             return jsonify(result)
         
-        if format_type == 'csv':
-            # Create file-like object
-            output = io.StringIO(result['data'])
-            output.seek(0)
+        # Branch on what the tracker produced; it matches the format case-insensitively
+        if result['format'] == 'csv':
+            rows = result['data']
+            
+            def generate():
+                # One reused buffer; each row is flushed to the client as it is written
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(row)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
             
-            return send_file(
-                io.BytesIO(output.getvalue().encode('utf-8')),
+            return Response(
+                stream_with_context(generate()),
                 mimetype='text/csv',
-                as_attachment=True,
-                download_name=result['filename']
+                headers={'Content-Disposition': f"attachment; filename={result['filename']}"}
             )
         else:
             return jsonify(result)
     except Exception as e:
-        logger.error(f"Error exporting price history: {e}")
+        logger.error("Error exporting price history: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/notifications')
+@etag_view
+@cached_view(watermark=_change_summary)
 def get_notifications():
     """API endpoint to get pending notifications."""
     try:
         notifications = tracker.db.get_pending_notifications()
         return jsonify({'success': True, 'notifications': notifications})
     except Exception as e:
-        logger.error(f"Error getting notifications: {e}")
+        logger.error("Error getting notifications: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/notifications/process', methods=['POST'])
 def process_notifications():
-    """API endpoint to process pending notifications."""
+    """API endpoint to start processing pending notifications in the background."""
     try:
-        result = tracker.process_notifications()
-        return jsonify(result)
+        task_id = submit_task(tracker.process_notifications, key='process-notifications')
+        return jsonify({'success': True, 'task_id': task_id}), 202
     except Exception as e:
-        logger.error(f"Error processing notifications: {e}")
+        logger.error("Error processing notifications: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/check-all', methods=['POST'])
 def check_all_products():
-    """API endpoint to check all product prices."""
+    """API endpoint to start checking all product prices in the background."""
     try:
-        result = tracker.check_all_products()
-        return jsonify(result)
+        task_id = submit_task(tracker.check_all_products, key='check-all')
+        return jsonify({'success': True, 'task_id': task_id}), 202
     except Exception as e:
-        logger.error(f"Error checking all products: {e}")
+        logger.error("Error checking all products: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/tasks/<task_id>')
+def get_task(task_id):
+    """API endpoint to poll a background task."""
+    future = _tasks.get(task_id)
+    if future is None:
+        return jsonify({'success': False, 'error': 'Unknown task'}), 404
+    
+    if not future.done():
+        return jsonify({'success': True, 'done': False})
+    
+    try:
+        result = future.result()
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    return jsonify({'success': True, 'done': True, 'result': result})
+
 @app.route('/api/test-scraping', methods=['POST'])
 def test_scraping():
     """API endpoint to test scraping for a URL."""
@@ -221,27 +578,37 @@ def test_scraping():
         result = tracker.test_scraping(data['url'])
         return jsonify(result)
     except Exception as e:
-        logger.error(f"Error testing scraping: {e}")
+        logger.error("Error testing scraping: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/test-email', methods=['POST'])
 def test_email():
     """API endpoint to test email configuration."""
+    global _last_test_email
+    
+    with _test_email_lock:
+        now = time.monotonic()
+        if now - _last_test_email < TEST_EMAIL_MIN_INTERVAL:
+            return jsonify({'success': False, 'error': 'Email was tested moments ago, try again shortly'}), 429
+        _last_test_email = now
+    
     try:
         result = tracker.test_email_configuration()
         return jsonify(result)
     except Exception as e:
-        logger.error(f"Error testing email: {e}")
+        logger.error("Error testing email: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/statistics')
+@etag_view
+@cached_view(watermark=_change_summary)
 def get_statistics():
     """API endpoint to get application statistics."""
     try:
         stats = tracker.get_statistics()
         return jsonify(stats)
     except Exception as e:
-        logger.error(f"Error getting statistics: {e}")
+        logger.error("Error getting statistics: %s", e)
         return jsonify({'error': str(e)})
 
 # Error handlers
@@ -258,11 +625,21 @@ def main():
     print("🌐 Starting Price Tracker Dashboard...")
     print(f"Dashboard will be available at: http://{Config.DASHBOARD_HOST}:{Config.DASHBOARD_PORT}")
     
-    app.run(
-        host=Config.DASHBOARD_HOST,
-        port=Config.DASHBOARD_PORT,
-        debug=Config.DASHBOARD_DEBUG
-    )
+    # Scrape and SMTP endpoints hold a thread on network I/O, so serve from a thread pool
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+    
+    if serve and not Config.DASHBOARD_DEBUG:
+        serve(app, host=Config.DASHBOARD_HOST, port=Config.DASHBOARD_PORT, threads=Config.DASHBOARD_THREADS)
+    else:
+        app.run(
+            host=Config.DASHBOARD_HOST,
+            port=Config.DASHBOARD_PORT,
+            debug=Config.DASHBOARD_DEBUG,
+            threaded=True
+        )
 
 if __name__ == "__main__":
     main()
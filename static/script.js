@@ -3,6 +3,27 @@
 // Global variables
 let currentProductId = null;
 
+// Plotly (scatter/line-only bundle) is loaded on the first chart view, not with the page
+const PLOTLY_SRC = 'https://cdn.plot.ly/plotly-basic-2.35.2.min.js';
+let plotlyLoader = null;
+
+function loadPlotly() {
+    if (window.Plotly) return Promise.resolve();
+    if (!plotlyLoader) {
+        plotlyLoader = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = PLOTLY_SRC;
+            script.onload = resolve;
+            script.onerror = () => {
+                plotlyLoader = null;
+                reject(new Error('Failed to load the charting library'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return plotlyLoader;
+}
+
 // Utility functions
 function showLoading(elementId) {
     document.getElementById(elementId).style.display = 'block';
@@ -26,6 +47,21 @@ function showAlert(message, type = 'info') {
     }, 5000);
 }
 
+// Actions still waiting on the server; repeat clicks are ignored until they finish
+const actionsInFlight = new Set();
+
+function beginAction(name, button) {
+    if (actionsInFlight.has(name)) return false;
+    actionsInFlight.add(name);
+    if (button) button.disabled = true;
+    return true;
+}
+
+function endAction(name, button) {
+    actionsInFlight.delete(name);
+    if (button) button.disabled = false;
+}
+
 // Modal functions
 function addProductModal() {
     new bootstrap.Modal(document.getElementById('addProductModal')).show();
@@ -39,8 +75,88 @@ function testEmailModal() {
     new bootstrap.Modal(document.getElementById('testEmailModal')).show();
 }
 
+// Write the statistics cards and navbar counters
+function updateStats(stats) {
+    const dbStats = stats.database_stats;
+    document.getElementById('stat-total-products').textContent = dbStats.total_products;
+    document.getElementById('stat-products-with-drops').textContent = dbStats.products_with_drops;
+    document.getElementById('stat-total-notifications').textContent = dbStats.total_notifications;
+    document.getElementById('stat-avg-drop').textContent = `${Number(dbStats.avg_drop_percent).toFixed(1)}%`;
+    document.getElementById('notification-count').textContent = stats.pending_notifications;
+    document.getElementById('last-updated').textContent = stats.last_check;
+}
+
+// Populate statistics and the products table from a single bootstrap request
+async function refreshDashboard() {
+    try {
+        const response = await fetch('/api/dashboard-bootstrap');
+        const result = await response.json();
+        
+        if (!result.success) {
+            showAlert(`Error: ${result.error}`, 'danger');
+            return;
+        }
+        
+        updateStats(result.stats);
+        
+        const table = document.getElementById('products-table');
+        table.textContent = '';
+        table.insertAdjacentHTML('beforeend', result.rows_html);
+    } catch (error) {
+        showAlert(`Error: ${error.message}`, 'danger');
+    }
+}
+
+// Periodic refresh: patch prices and check times in place, rebuilding the table only when rows changed
+async function refreshProducts() {
+    try {
+        const [productsResponse, statsResponse] = await Promise.all([
+            fetch('/api/products'),
+            fetch('/api/statistics')
+        ]);
+        const result = await productsResponse.json();
+        const stats = await statsResponse.json();
+        
+        if (!result.success || stats.error) {
+            showAlert(`Error: ${result.error || stats.error}`, 'danger');
+            return;
+        }
+        
+        requestAnimationFrame(() => {
+            const table = document.getElementById('products-table');
+            const rows = result.products.map(product => [product, table.querySelector(`tr[data-product-id="${product.id}"]`)]);
+            
+            if (rows.length !== table.rows.length || rows.some(([product, row]) => !row || row.dataset.active !== String(Number(product.is_active)))) {
+                refreshDashboard();
+                return;
+            }
+            
+            updateStats(stats);
+            for (const [product, row] of rows) {
+                row.querySelector('.current-price').textContent = `₹${(product.current_price || 0).toFixed(2)}`;
+                row.querySelector('.last-checked').textContent = product.last_checked;
+            }
+        });
+    } catch (error) {
+        showAlert(`Error: ${error.message}`, 'danger');
+    }
+}
+
+// Poll a background task every 2 seconds until it finishes, then return its result
+async function waitForTask(taskId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const response = await fetch(`/api/tasks/${taskId}`);
+        const task = await response.json();
+        
+        if (!task.success) throw new Error(task.error);
+        if (task.done) return task.result;
+    }
+}
+
 // API functions
-async function submitAddProduct() {
+async function submitAddProduct(button) {
+    if (!beginAction('add-product', button)) return;
     const url = document.getElementById('productUrl').value;
     const thresholdPrice = document.getElementById('thresholdPrice').value;
     const productName = document.getElementById('productName').value;
@@ -56,12 +172,14 @@ async function submitAddProduct() {
         
         if (result.success) {
             showAlert('Product added successfully!', 'success');
-            location.reload();
+            refreshDashboard();
         } else {
             showAlert(`Error: ${result.error}`, 'danger');
         }
     } catch (error) {
         showAlert(`Error: ${error.message}`, 'danger');
+    } finally {
+        endAction('add-product', button);
     }
 }
 
@@ -88,27 +206,34 @@ async function checkProduct(productId) {
     }
 }
 
-async function checkAllProducts() {
+async function checkAllProducts(button) {
+    if (!beginAction('check-all', button)) return;
     try {
         showAlert('Checking all products...', 'info');
         const response = await fetch('/api/check-all', { method: 'POST' });
-        const result = await response.json();
+        const started = await response.json();
+        const result = started.success ? await waitForTask(started.task_id) : started;
         
         if (result.success) {
             showAlert(`Checked ${result.products_checked} products. Found ${result.price_drops} price drops.`, 'success');
-            location.reload();
+            refreshDashboard();
         } else {
             showAlert(`Error: ${result.error}`, 'danger');
         }
     } catch (error) {
         showAlert(`Error: ${error.message}`, 'danger');
+    } finally {
+        endAction('check-all', button);
     }
 }
 
-async function processNotifications() {
+async function processNotifications(button) {
+    if (!beginAction('process-notifications', button)) return;
     try {
+        showAlert('Processing notifications...', 'info');
         const response = await fetch('/api/notifications/process', { method: 'POST' });
-        const result = await response.json();
+        const started = await response.json();
+        const result = started.success ? await waitForTask(started.task_id) : started;
         
         if (result.success) {
             showAlert(`Processed ${result.notifications_processed} notifications. Sent ${result.emails_sent} emails.`, 'success');
@@ -118,18 +243,22 @@ async function processNotifications() {
         }
     } catch (error) {
         showAlert(`Error: ${error.message}`, 'danger');
+    } finally {
+        endAction('process-notifications', button);
     }
 }
 
 async function viewChart(productId) {
     currentProductId = productId;
     try {
-        const response = await fetch(`/api/products/${productId}/chart`);
+        const [response] = await Promise.all([
+            fetch(`/api/products/${productId}/chart`),
+            loadPlotly()
+        ]);
         const result = await response.json();
         
         if (result.success) {
-            const chartData = JSON.parse(result.chart);
-            Plotly.newPlot('priceChart', chartData.data, chartData.layout);
+            Plotly.newPlot('priceChart', result.chart.data, result.chart.layout);
             new bootstrap.Modal(document.getElementById('chartModal')).show();
         } else {
             showAlert(`Error: ${result.error}`, 'danger');
@@ -156,7 +285,7 @@ async function deleteProduct(productId) {
         
         if (result.success) {
             showAlert('Product deactivated successfully!', 'success');
-            location.reload();
+            refreshDashboard();
         } else {
             showAlert(`Error: ${result.error}`, 'danger');
         }
@@ -165,7 +294,8 @@ async function deleteProduct(productId) {
     }
 }
 
-async function testScraping() {
+async function testScraping(button) {
+    if (!beginAction('test-scraping', button)) return;
     const url = document.getElementById('testUrl').value;
     const resultsDiv = document.getElementById('testResults');
     
@@ -199,10 +329,13 @@ async function testScraping() {
         }
     } catch (error) {
         resultsDiv.innerHTML = `<div class="alert alert-danger">Error: ${error.message}</div>`;
+    } finally {
+        endAction('test-scraping', button);
     }
 }
 
-async function testEmail() {
+async function testEmail(button) {
+    if (!beginAction('test-email', button)) return;
     const resultsDiv = document.getElementById('emailTestResults');
     
     try {
@@ -224,16 +357,37 @@ async function testEmail() {
         }
     } catch (error) {
         resultsDiv.innerHTML = `<div class="alert alert-danger">Error: ${error.message}</div>`;
+    } finally {
+        endAction('test-email', button);
     }
 }
 
-// Auto-refresh every 5 minutes
-setInterval(() => {
-    location.reload();
-}, 300000);
+// Auto-refresh every 5 minutes while the tab is visible
+let refreshTimer = null;
+
+function startAutoRefresh() {
+    if (!refreshTimer) refreshTimer = setInterval(refreshProducts, 300000);
+}
+
+function stopAutoRefresh() {
+    clearInterval(refreshTimer);
+    refreshTimer = null;
+}
+
+document.addEventListener('visibilitychange', () => {
+    if (document.hidden) {
+        stopAutoRefresh();
+    } else {
+        refreshProducts();
+        startAutoRefresh();
+    }
+});
 
 // Initialize tooltips and other Bootstrap components
 document.addEventListener('DOMContentLoaded', function() {
+    refreshDashboard();
+    startAutoRefresh();
+    
     // Initialize Bootstrap tooltips
     var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
     var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {